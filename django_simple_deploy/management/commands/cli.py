@@ -9,6 +9,8 @@ def get_usage():
         [--automate-all]
         [--no-logging]
         [--ignore-unclean-git]
+        [--profile-startup]
+        [--plan]
 
         [--region REGION]
         [--deployed-project-name DEPLOYED_PROJECT_NAME]"""
@@ -56,6 +58,20 @@ class SimpleDeployCLI:
             action="store_true",
         )
 
+        # Let users see where the startup time of the deploy command goes.
+        behavior_group.add_argument(
+            "--profile-startup",
+            help="Report how much time is spent importing Django, django-simple-deploy, the plugin, and your project, then exit.",
+            action="store_true",
+        )
+
+        # Let users see what the deploy command would do, without doing it.
+        behavior_group.add_argument(
+            "--plan",
+            help="Show the changes that would be made to the project, and the commands that would be run, without changing anything.",
+            action="store_true",
+        )
+
         # --- Arguments to customize deployment configuration ---
 
         # Allow users to set the deployed project name. This is the name that will be
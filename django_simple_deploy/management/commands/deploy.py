@@ -28,17 +28,23 @@ See the documentation for more about this process:
 import sys, os, platform, re, subprocess, logging, shlex
 from datetime import datetime
 from pathlib import Path
+from concurrent.futures import ThreadPoolExecutor
 from importlib import import_module
+from importlib.util import find_spec
 from importlib.metadata import version
 
 from django.core.management.base import BaseCommand
 from django.conf import settings
 
-import toml
-
 from . import dsd_messages
 from .utils import dsd_utils
 from .utils import plugin_utils
+from .utils import startup_profiler
+from .utils import git_status
+from .utils.project_snapshot import ProjectSnapshot
+from .utils.change_set import ChangeSet
+from .utils.requirements_index import RequirementsIndex
+from .utils.req_txt_parser import parse_req_txt_files
 
 from .utils.plugin_utils import dsd_config
 from .utils.command_errors import DSDCommandError
@@ -132,6 +138,11 @@ class Command(BaseCommand):
         # has been passed.
         self._parse_cli_options(options)
 
+        # Profiling startup is a diagnostic mode; don't configure anything.
+        if options["profile_startup"]:
+            self._profile_startup()
+            return
+
         if dsd_config.log_output:
             self._start_logging()
             self._log_cli_args(options)
@@ -154,30 +165,54 @@ class Command(BaseCommand):
         plugin_utils.write_output(f"\nDeployment target: {platform_name}")
         plugin_utils.write_output(f"  Using plugin: {self.plugin_name}")
 
+        # From here on, changes to the project are staged, and only written if the
+        # run doesn't fail.
+        dsd_config.change_set = ChangeSet(dry_run=dsd_config.plan)
+
         # Inspect the user's system and project, and make sure django-simple-deploy is included
         # in project requirements.
         self._inspect_system()
         self._inspect_project()
-        self._add_dsd_req()
 
-        self._confirm_automate_all(pm)
+        # In plan mode, inspection runs normally. After that, commands are recorded
+        # instead of being run.
+        if dsd_config.plan:
+            dsd_config.planned_commands = []
 
-        # At this point dsd_config is fully defined, so we can validate it before handing
-        # responsibility off to plugin.
-        dsd_config.validate()
+        try:
+            self._add_dsd_req()
 
-        # Before handoff, log all dsd_config values.
-        self._log_dsd_config()
+            self._confirm_automate_all(pm)
 
-        # Platform-agnostic work is finished. Hand off to plugin.
-        pm.hook.dsd_deploy()
+            # At this point dsd_config is fully defined, so we can validate it before
+            # handing responsibility off to plugin.
+            dsd_config.validate()
+
+            # Before handoff, log all dsd_config values.
+            self._log_dsd_config()
+
+            # Platform-agnostic work is finished. Hand off to plugin.
+            self._load_plugin_deploy_module()
+            pm.hook.dsd_deploy()
+        except DSDCommandError:
+            # Don't leave a half-configured project behind.
+            dsd_config.change_set.rollback()
+            raise
+        else:
+            if dsd_config.plan:
+                self._show_plan()
+            else:
+                plugin_utils.commit_staged_changes()
+            self._show_unchanged_files()
 
     def _parse_cli_options(self, options):
         """Parse CLI options from deploy command."""
 
         # Platform-agnostic arguments.
         dsd_config.automate_all = options["automate_all"]
-        dsd_config.log_output = not (options["no_logging"])
+        # Plan mode doesn't write anything, including logs.
+        dsd_config.plan = options["plan"]
+        dsd_config.log_output = not (options["no_logging"] or dsd_config.plan)
         self.ignore_unclean_git = options["ignore_unclean_git"]
 
         # Platform.sh arguments.
@@ -234,6 +269,36 @@ class Command(BaseCommand):
         for k, v in dsd_config.__dict__.items():
             plugin_utils.log_info(f"  {k}: {v}")
 
+    def _profile_startup(self):
+        """Profile the import time of core, the plugin, and the user's project.
+
+        Writes a full report to the log directory, and shows a summary.
+        """
+        plugin_utils.write_output("Profiling startup imports...", skip_logging=True)
+
+        project_root = Path(settings.BASE_DIR)
+        output = startup_profiler.run_importtime(self.plugin_name, project_root)
+        roots = startup_profiler.parse_importtime(output)
+        if not roots:
+            msg = "Could not profile startup imports. Output from the profiling run:"
+            msg += f"\n{output}"
+            raise DSDCommandError(msg)
+
+        project_packages = startup_profiler.get_project_packages(project_root)
+        summary, report = startup_profiler.build_report(
+            roots, self.plugin_name, project_packages
+        )
+
+        self._create_log_dir()
+        timestamp = datetime.now().strftime("%Y-%m-%d-%H%M%S")
+        report_path = self.log_dir_path / f"dsd_startup_profile_{timestamp}.txt"
+        report_path.write_text(report)
+
+        plugin_utils.write_output(f"\n{summary}", skip_logging=True)
+        plugin_utils.write_output(
+            f"\nWrote full report to {report_path}.", skip_logging=True
+        )
+
     def _create_log_dir(self):
         """Create a directory to hold log files, if not already present.
 
@@ -254,12 +319,32 @@ class Command(BaseCommand):
         The plugin name is not usually specified as a CLI arg, because most users will
         only have one plugin installed. We inspect the installed packages, and try to
         identify the installed plugin automatically.
+
+        A plugin can provide a lightweight `plugin_meta` module, implementing the
+        config and CLI hooks. If it does, only that module is loaded here. The plugin's
+        `deploy` module is loaded when handle() hands off to the plugin, so
+        `deploy --help` and invalid CLI args don't pay for importing everything the
+        plugin needs to carry out a deployment.
         """
         self.plugin_name = dsd_utils.get_plugin_name()
 
+        if find_spec(f"{self.plugin_name}.plugin_meta"):
+            self.plugin_deploy_loaded = False
+            return import_module(f"{self.plugin_name}.plugin_meta")
+
+        self.plugin_deploy_loaded = True
         platform_module = import_module(f"{self.plugin_name}.deploy")
         return platform_module
 
+    def _load_plugin_deploy_module(self):
+        """Load the plugin's deploy module, if that wasn't done in _load_plugin()."""
+        if self.plugin_deploy_loaded:
+            return
+
+        deploy_module = import_module(f"{self.plugin_name}.deploy")
+        pm.register(deploy_module)
+        self.plugin_deploy_loaded = True
+
     def _validate_command(self):
         """Verify deploy has been called with a valid set of arguments.
 
@@ -306,9 +391,11 @@ class Command(BaseCommand):
         Anything that might cause us to exit before making the first remote call should
         be inspected here.
 
+        Every project file that's examined is read once, into dsd_config.project_snapshot.
+
         Sets:
             self.local_project_name, self.project_root, self.settings_path,
-            self.pkg_manager, self.requirements
+            self.pkg_manager, self.requirements, self.project_snapshot
 
         Returns:
             None
@@ -319,8 +406,10 @@ class Command(BaseCommand):
         dsd_config.project_root = Path(settings.BASE_DIR)
         plugin_utils.log_info(f"Project root: {dsd_config.project_root}")
 
-        # Find .git location, and make sure there's a clean status.
+        # Find .git location, read everything we need from the project, and make sure
+        # there's a clean status.
         self._find_git_dir()
+        dsd_config.project_snapshot = self._take_project_snapshot()
         self._check_git_status()
 
         # Now that we know where .git is, we can ignore dsd logs.
@@ -331,6 +420,7 @@ class Command(BaseCommand):
 
         # Find out which package manager is being used: req_txt, poetry, or pipenv
         dsd_config.pkg_manager = self._get_dep_man_approach()
+
         msg = f"Dependency management system: {dsd_config.pkg_manager}"
         plugin_utils.write_output(msg)
 
@@ -370,6 +460,65 @@ class Command(BaseCommand):
             error_msg += f"\n  Looked in {dsd_config.project_root} and in {dsd_config.project_root.parent}."
             raise DSDCommandError(error_msg)
 
+    def _get_inspected_paths(self):
+        """Get paths to the files that settings and requirements are found in.
+
+        Returns:
+            List[Path]
+        """
+        settings_dir = dsd_config.project_root / dsd_config.local_project_name
+        return [
+            settings_dir / "settings.py",
+            settings_dir / "settings" / "production.py",
+            dsd_config.git_path / "Pipfile",
+            dsd_config.git_path / "pyproject.toml",
+            dsd_config.git_path / "requirements.txt",
+        ]
+
+    def _take_project_snapshot(self):
+        """Read all project files that core and plugin_utils need, and git status.
+
+        Returns:
+            ProjectSnapshot
+        """
+        paths = self._get_inspected_paths() + [dsd_config.git_path / ".gitignore"]
+
+        if self.ignore_unclean_git:
+            return ProjectSnapshot.build(paths)
+
+        # In large repos, git commands can take seconds. Read project files while they
+        # run. Commands are logged here rather than in the worker thread, to keep
+        # logging on the main thread.
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            git_future = executor.submit(self._run_git_checks)
+            snapshot = ProjectSnapshot.build(paths)
+            status, diff_output = git_future.result()
+
+        plugin_utils.log_info(f"\n{' '.join(git_status.STATUS_CMD)}")
+        plugin_utils.log_info(f"{status}")
+        if status.proceed and status.modified_paths:
+            diff_cmd = git_status.DIFF_CMD + ["--"] + status.modified_paths
+            plugin_utils.log_info(f"\n{' '.join(diff_cmd)}")
+            plugin_utils.log_info(f"{diff_output}\n")
+
+        return snapshot.with_git_output(status, diff_output)
+
+    def _run_git_checks(self):
+        """Get git status, and the diffs of any files dsd is allowed to have modified.
+
+        The diff is limited to files that git status reports as allowed modifications,
+        so its cost doesn't depend on the rest of the working tree. If status already
+        rules out proceeding, there's no need to run it at all.
+
+        Returns:
+            Tuple[GitStatus, str]: Status, and diff output.
+        """
+        status = git_status.get_git_status()
+        if not status.proceed:
+            return status, ""
+
+        return status, git_status.get_git_diff(status.modified_paths)
+
     def _check_git_status(self):
         """Make sure all non-dsd changes have already been committed.
 
@@ -395,17 +544,10 @@ class Command(BaseCommand):
             plugin_utils.write_output(msg)
             return
 
-        cmd = "git status --porcelain"
-        output_obj = plugin_utils.run_quick_command(cmd)
-        status_output = output_obj.stdout.decode()
-        plugin_utils.log_info(f"{status_output}")
-
-        cmd = "git diff --unified=0"
-        output_obj = plugin_utils.run_quick_command(cmd)
-        diff_output = output_obj.stdout.decode()
-        plugin_utils.log_info(f"{diff_output}\n")
-
-        proceed = dsd_utils.check_status_output(status_output, diff_output)
+        snapshot = dsd_config.project_snapshot
+        proceed = snapshot.git_status.proceed and dsd_utils.check_git_diff(
+            snapshot.git_diff
+        )
 
         if proceed:
             msg = "No uncommitted changes, other than django-simple-deploy work."
@@ -429,17 +571,17 @@ class Command(BaseCommand):
         ignore_msg = "dsd_logs/\n"
 
         gitignore_path = dsd_config.git_path / ".gitignore"
-        if not gitignore_path.exists():
+        if not plugin_utils._file_exists(gitignore_path):
             # Make the .gitignore file, and add log directory.
-            gitignore_path.write_text(ignore_msg, encoding="utf-8")
+            plugin_utils._write_file(gitignore_path, ignore_msg)
             plugin_utils.write_output("No .gitignore file found; created .gitignore.")
             plugin_utils.write_output("Added dsd_logs/ to .gitignore.")
         else:
             # Append log directory to .gitignore if it's not already there.
-            contents = gitignore_path.read_text()
+            contents = plugin_utils._read_file(gitignore_path)
             if "dsd_logs/" not in contents:
                 contents += f"\n{ignore_msg}"
-                gitignore_path.write_text(contents)
+                plugin_utils._write_file(gitignore_path, contents)
                 plugin_utils.write_output("Added dsd_logs/ to .gitignore")
 
     def _get_settings_path(self):
@@ -449,12 +591,16 @@ class Command(BaseCommand):
         For Wagtail and projects with a similar structure, this will be
           project_name/settings/production.py.
         """
-        standard_path = dsd_config.project_root / dsd_config.local_project_name / "settings.py"
-        if standard_path.exists():
+        snapshot = dsd_config.project_snapshot
+
+        standard_path = (
+            dsd_config.project_root / dsd_config.local_project_name / "settings.py"
+        )
+        if snapshot.exists(standard_path):
             return standard_path
 
         wagtail_path = dsd_config.project_root / dsd_config.local_project_name / "settings" / "production.py"
-        if wagtail_path.exists():
+        if snapshot.exists(wagtail_path):
             # Mark this as a Wagtail project.
             dsd_config.wagtail_project = True
 
@@ -489,11 +635,13 @@ class Command(BaseCommand):
         Raises:
             DSDCommandError: If a pkg manager can't be identified.
         """
-        if (dsd_config.git_path / "Pipfile").exists():
+        snapshot = dsd_config.project_snapshot
+
+        if snapshot.exists(dsd_config.git_path / "Pipfile"):
             return "pipenv"
         elif self._check_using_poetry():
             return "poetry"
-        elif (dsd_config.git_path / "requirements.txt").exists():
+        elif snapshot.exists(dsd_config.git_path / "requirements.txt"):
             return "req_txt"
 
         # Exit if we haven't found any requirements.
@@ -510,11 +658,13 @@ class Command(BaseCommand):
         Returns:
             bool: True if found, False if not found.
         """
+        snapshot = dsd_config.project_snapshot
+
         path = dsd_config.git_path / "pyproject.toml"
-        if not path.exists():
+        if not snapshot.exists(path):
             return False
 
-        pptoml_data = toml.load(path)
+        pptoml_data = snapshot.load_toml(path)
         return "poetry" in pptoml_data.get("tool", {})
 
     def _get_current_requirements(self):
@@ -528,20 +678,19 @@ class Command(BaseCommand):
             self.req_txt_path
 
         Returns:
-            List[str]: List of strings, each representing a requirement.
+            RequirementsIndex: Current requirements, keyed by normalized name.
         """
         msg = "Checking current project requirements..."
         plugin_utils.write_output(msg)
 
         if dsd_config.pkg_manager == "req_txt":
             dsd_config.req_txt_path = dsd_config.git_path / "requirements.txt"
-            requirements = dsd_utils.parse_req_txt(dsd_config.req_txt_path)
         elif dsd_config.pkg_manager == "pipenv":
             dsd_config.pipfile_path = dsd_config.git_path / "Pipfile"
-            requirements = dsd_utils.parse_pipfile(dsd_config.pipfile_path)
         elif dsd_config.pkg_manager == "poetry":
             dsd_config.pyprojecttoml_path = dsd_config.git_path / "pyproject.toml"
-            requirements = dsd_utils.parse_pyproject_toml(dsd_config.pyprojecttoml_path)
+
+        requirements = self._parse_requirements(dsd_config.project_snapshot)
 
         # Report findings.
         msg = "  Found existing dependencies:"
@@ -552,6 +701,23 @@ class Command(BaseCommand):
 
         return requirements
 
+    def _parse_requirements(self, snapshot):
+        """Parse requirements from the dependency file in snapshot.
+
+        Returns:
+            RequirementsIndex
+        """
+        if dsd_config.pkg_manager == "req_txt":
+            path = dsd_config.git_path / "requirements.txt"
+            parsed = parse_req_txt_files(path, snapshot.read_text(path))
+            return RequirementsIndex(parsed.requirements)
+        elif dsd_config.pkg_manager == "pipenv":
+            path = dsd_config.git_path / "Pipfile"
+            return RequirementsIndex.from_pipfile(snapshot.load_toml(path))
+        elif dsd_config.pkg_manager == "poetry":
+            path = dsd_config.git_path / "pyproject.toml"
+            return RequirementsIndex.from_pyproject_toml(snapshot.load_toml(path))
+
     def _add_dsd_req(self):
         """Add django-simple-deploy to the project's requirements.
 
@@ -621,3 +787,33 @@ class Command(BaseCommand):
             # Quit with a message, but don't raise an error.
             plugin_utils.write_output(dsd_messages.cancel_automate_all)
             sys.exit()
+
+    def _show_unchanged_files(self):
+        """List files that already had the contents dsd would have written."""
+        if not dsd_config.unchanged_files:
+            return
+
+        msg = "\nThese files were already up to date, and weren't rewritten:"
+        plugin_utils.write_output(msg)
+        for path in dsd_config.unchanged_files:
+            plugin_utils.write_output(f"  {path.as_posix()}")
+
+    def _show_plan(self):
+        """Show the changes and commands a run would make, in plan mode."""
+        change_set = dsd_config.change_set
+
+        plugin_utils.write_output("\n--- Planned changes ---")
+        for path in change_set.dirs:
+            plugin_utils.write_output(f"New directory: {path.as_posix()}")
+
+        diff = change_set.diff(dsd_config.git_path)
+        if diff:
+            plugin_utils.write_output(diff.rstrip("\n"))
+        elif not change_set.dirs:
+            plugin_utils.write_output("No changes to project files.")
+
+        plugin_utils.write_output("\n--- Planned commands ---")
+        for cmd in dsd_config.planned_commands:
+            plugin_utils.write_output(f"  {cmd}")
+        if not dsd_config.planned_commands:
+            plugin_utils.write_output("No commands would be run.")
@@ -102,3 +102,34 @@ def file_replace_rejected(filename):
     """
     )
     return msg
+
+
+def files_found(filenames):
+    """Found several files that we plan to write.
+
+    Permission to replace all of them is requested at once.
+    """
+
+    file_list = "".join(f"    {filename}\n" for filename in filenames)
+    msg = "\nThese files already exist:\n" + file_list
+    msg += "Is it okay to replace these files?\n"
+    return msg
+
+
+def files_replace_rejected(filenames):
+    """Permission denied to replace existing files.
+
+    We can't proceed without this permission.
+    """
+
+    file_list = "".join(f"    {filename}\n" for filename in filenames)
+    msg = dedent(
+        """
+        In order to configure the project for deployment, we need to write these files:
+    """
+    )
+    msg += file_list
+    msg += (
+        "Please remove the current versions, and then run the deploy command again.\n"
+    )
+    return msg
@@ -0,0 +1,95 @@
+"""Run commands as asyncio subprocesses, so several can run at once.
+
+Plugins often make a handful of independent platform CLI calls, such as checking
+authentication, creating an app, and creating a database. `plugin_utils` has async
+versions of `run_quick_command()` and `run_slow_command()` that are built on the
+functions here, and `run_commands_concurrently()` for callers that aren't async.
+
+The number of commands running at once in an event loop is limited by a semaphore.
+If a task running a command is cancelled, for example when the user presses Ctrl-C
+during `asyncio.run()`, the process is killed before the cancellation propagates.
+"""
+
+import asyncio
+import shlex
+import subprocess
+import weakref
+
+
+# Maximum number of commands running at once, in each event loop.
+MAX_CONCURRENT_COMMANDS = 4
+
+_semaphores = weakref.WeakKeyDictionary()
+
+
+def get_semaphore():
+    """Get the semaphore limiting commands in the running event loop."""
+    loop = asyncio.get_running_loop()
+    if loop not in _semaphores:
+        _semaphores[loop] = asyncio.Semaphore(MAX_CONCURRENT_COMMANDS)
+    return _semaphores[loop]
+
+
+async def run_captured(cmd, use_shell=False):
+    """Run a command, and capture its output.
+
+    Returns:
+        CompletedProcess: stdout and stderr are bytes.
+    """
+    async with get_semaphore():
+        proc = await _start_process(cmd, use_shell, stdout=subprocess.PIPE)
+        try:
+            stdout, stderr = await proc.communicate()
+        except asyncio.CancelledError:
+            await _kill(proc)
+            raise
+
+    return subprocess.CompletedProcess(cmd, proc.returncode, stdout, stderr)
+
+
+async def run_streamed(cmd, on_line, use_shell=False):
+    """Run a command, calling on_line() with each line it writes to stdout or stderr.
+
+    Lines are passed to on_line() as they're read, so lines from the two streams are
+    interleaved in the order they arrive.
+
+    Returns:
+        int: The command's return code.
+    """
+
+    async def read_lines(stream):
+        async for line in stream:
+            on_line(line.decode("utf-8", errors="replace"))
+
+    async with get_semaphore():
+        proc = await _start_process(cmd, use_shell, stdout=subprocess.PIPE)
+        try:
+            await asyncio.gather(read_lines(proc.stdout), read_lines(proc.stderr))
+            return await proc.wait()
+        except asyncio.CancelledError:
+            await _kill(proc)
+            raise
+
+
+# --- Helper functions ---
+
+
+async def _start_process(cmd, use_shell, stdout):
+    """Start a command, with stderr piped."""
+    if use_shell:
+        return await asyncio.create_subprocess_shell(
+            cmd, stdout=stdout, stderr=subprocess.PIPE
+        )
+    return await asyncio.create_subprocess_exec(
+        *shlex.split(cmd), stdout=stdout, stderr=subprocess.PIPE
+    )
+
+
+async def _kill(proc):
+    """Kill a process that's still running, and wait for it to exit."""
+    if proc.returncode is None:
+        try:
+            proc.kill()
+        except ProcessLookupError:
+            pass
+        await proc.wait()
@@ -0,0 +1,195 @@
+"""Changes to the user's project, staged in memory until they're committed.
+
+Core and plugins modify the project through the `plugin_utils` helpers. When a
+`ChangeSet` is active at `dsd_config.change_set`, those helpers stage new file contents
+here instead of writing to disk. If the run fails with a `DSDCommandError`, staged
+changes are discarded, and the project is left as it was.
+
+Staged changes are committed in one pass. Every file is first written to a temporary
+file in the same directory, and then moved into place with `os.replace()`, which is
+atomic. If any temporary file can't be written, nothing in the project is modified.
+
+Changes are also committed before running any command, because commands such as
+`git add` or `poetry export` need to see the project as it's been configured so far.
+Committed changes can't be rolled back.
+
+New directories are created right away, because plugins often look inside a directory
+they've just added. If a run is rolled back, directories created during the run are
+removed if they're still empty.
+
+A dry-run change set, used by `deploy --plan`, never touches disk. Directories are only
+recorded, and `diff()` shows what committing would change.
+"""
+
+import difflib
+import os
+import stat
+import tempfile
+from pathlib import Path
+
+
+class ChangeSet:
+    """File writes and new directories for the current run."""
+
+    def __init__(self, dry_run=False):
+        self.dry_run = dry_run
+
+        # Staged contents of each file, in the order files were first written.
+        self._files = {}
+        # Directories added since the last commit. In a dry run, these aren't created.
+        self._created_dirs = []
+
+    def __contains__(self, path):
+        return Path(path) in self._files
+
+    def __len__(self):
+        return len(self._files)
+
+    def __repr__(self):
+        paths = ", ".join(path.as_posix() for path in self._files)
+        return f"ChangeSet(files=[{paths}])"
+
+    @property
+    def paths(self):
+        """Paths of files with staged changes."""
+        return list(self._files)
+
+    @property
+    def dirs(self):
+        """Directories added since the last commit."""
+        return list(self._created_dirs)
+
+    def write_file(self, path, contents):
+        """Stage new contents for a file."""
+        self._files[Path(path)] = contents
+
+    def read_text(self, path):
+        """Get the staged contents of a file, or None if it has no staged changes."""
+        return self._files.get(Path(path))
+
+    def add_dir(self, path):
+        """Create a directory, and remember it in case the run is rolled back."""
+        path = Path(path)
+        if not self.dry_run:
+            path.mkdir()
+        self._created_dirs.append(path)
+
+    def commit(self):
+        """Write all staged files to disk.
+
+        Returns:
+            list: Paths that were written.
+
+        Raises:
+            OSError: If a file can't be written. No project files are modified if this
+            happens while writing temporary files.
+            RuntimeError: If this is a dry run.
+        """
+        if self.dry_run:
+            raise RuntimeError("A dry-run change set can't be committed.")
+
+        temp_paths = {}
+        try:
+            for path, contents in self._files.items():
+                temp_paths[path] = _write_temp_file(path, contents)
+        except OSError:
+            for temp_path in temp_paths.values():
+                Path(temp_path).unlink(missing_ok=True)
+            raise
+
+        for path, temp_path in temp_paths.items():
+            os.replace(temp_path, path)
+
+        written_paths = list(self._files)
+        self._files.clear()
+        self._created_dirs.clear()
+        return written_paths
+
+    def rollback(self):
+        """Discard staged changes.
+
+        Directories created since the last commit are removed, if they're empty.
+        """
+        self._files.clear()
+
+        for path in reversed(self._created_dirs):
+            try:
+                path.rmdir()
+            except OSError:
+                # Not empty, or already removed.
+                pass
+        self._created_dirs.clear()
+
+    def diff(self, root):
+        """Get a unified diff of staged changes, against the files on disk.
+
+        Paths in the diff are relative to root.
+
+        Returns:
+            str
+        """
+        diffs = []
+        for path, contents in self._files.items():
+            try:
+                old_contents = path.read_text()
+            except FileNotFoundError:
+                old_contents = None
+
+            try:
+                rel_path = path.relative_to(root).as_posix()
+            except ValueError:
+                rel_path = path.as_posix()
+            from_file = f"a/{rel_path}" if old_contents is not None else "/dev/null"
+            diff_lines = difflib.unified_diff(
+                _split_lines(old_contents or ""),
+                _split_lines(contents),
+                fromfile=from_file,
+                tofile=f"b/{rel_path}",
+            )
+            diffs.append("".join(diff_lines))
+
+        return "".join(diffs)
+
+
+# --- Helper functions ---
+
+
+def _split_lines(contents):
+    """Split contents into lines for difflib, marking a missing final newline."""
+    lines = contents.splitlines(keepends=True)
+    if lines and not lines[-1].endswith("\n"):
+        lines[-1] += "\n\\ No newline at end of file\n"
+    return lines
+
+
+def _write_temp_file(path, contents):
+    """Write contents to a temporary file next to path.
+
+    The temporary file gets the permissions of the file it will replace, or the
+    default permissions for a new file.
+
+    Returns:
+        str: Path to the temporary file.
+    """
+    fd, temp_path = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}.")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write(contents)
+
+        try:
+            mode = stat.S_IMODE(path.stat().st_mode)
+        except FileNotFoundError:
+            mode = 0o666 & ~_get_umask()
+        os.chmod(temp_path, mode)
+    except OSError:
+        Path(temp_path).unlink(missing_ok=True)
+        raise
+
+    return temp_path
+
+
+def _get_umask():
+    """Get the current umask, which can only be read by setting it."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
@@ -35,6 +35,23 @@ class DSDConfig:
         self.nanodjango_script = None
         self.wagtail_project = False
 
+        # Contents of project files, read once during inspection. See ProjectSnapshot.
+        self.project_snapshot = None
+
+        # Project changes staged during this run, written when the run finishes. See
+        # ChangeSet.
+        self.change_set = None
+
+        # In plan mode, commands are recorded here instead of being run, once
+        # inspection is finished. Read-only quick commands still run. Plugins can
+        # check plan before parsing the output of commands that change something.
+        self.plan = False
+        self.planned_commands = None
+
+        # Files that add_file() and modify_file() didn't rewrite, because they
+        # already had the requested contents.
+        self.unchanged_files = []
+
         # Paths in user's local project.
         self.project_root = None
         self.git_path = None
@@ -5,17 +5,26 @@ Any utility used by plugins should be moved to plugin_utils.py.
 """
 
 from pathlib import Path
-import inspect, re, sys, subprocess, logging
-from importlib.metadata import packages_distributions
+import inspect, re, sys, os, subprocess, logging, json
+from importlib.metadata import packages_distributions, entry_points
 
 from django.template.engine import Engine, Context
 from django.template.utils import get_app_template_dirs
 
 from .command_errors import DSDCommandError
+from .req_txt_parser import parse_req_txt_files
 
 import toml
 
 
+# Plugins advertise themselves to core through this entry point group. The value of
+# each entry point is the plugin's top-level package, ie `flyio = "dsd_flyio"`.
+PLUGIN_ENTRY_POINT_GROUP = "django_simple_deploy"
+
+# Cached results of plugin discovery, for every environment that's run deploy.
+PLUGIN_MANIFEST_FILENAME = "plugins.json"
+
+
 def validate_choice(choice, valid_choices):
     """Validate a choice made by the user."""
     if choice in valid_choices:
@@ -25,8 +34,55 @@ def validate_choice(choice, valid_choices):
 
 def get_plugin_name():
     """Get the name of the installed plugin."""
-    available_packages = packages_distributions().keys()
-    return _get_plugin_name_from_packages(available_packages)
+    plugin_names = find_plugin_names()
+    return _select_plugin_name(plugin_names)
+
+
+def find_plugin_names(cache_dir=None):
+    """Find the names of all installed plugins.
+
+    Finding plugins means looking through the metadata of installed distributions,
+    which is slow in large environments. The result is cached in a small manifest,
+    keyed by the mtimes of the site-packages directories. Those mtimes change
+    whenever a distribution is installed or removed, so on warm runs discovery only
+    costs a stat call per site-packages directory.
+
+    One manifest holds an entry for each environment, keyed by sys.prefix, so
+    switching between virtual environments doesn't invalidate the cache. Entries for
+    environments that no longer exist are removed when the manifest is written.
+
+    Returns:
+        List[str]: Names of installed plugin packages.
+    """
+    manifest_path = _get_plugin_manifest_path(cache_dir)
+    key = _get_site_packages_key()
+
+    try:
+        manifest = json.loads(manifest_path.read_text())
+    except (OSError, ValueError):
+        manifest = {}
+    if not isinstance(manifest, dict):
+        manifest = {}
+
+    entry = manifest.get(sys.prefix, {})
+    if key and entry.get("key") == key:
+        return entry["plugin_names"]
+
+    plugin_names = _scan_for_plugin_names()
+
+    manifest = {
+        prefix: entry for prefix, entry in manifest.items() if Path(prefix).exists()
+    }
+    manifest[sys.prefix] = {"key": key, "plugin_names": plugin_names}
+
+    # The manifest is only an optimization; discovery works without it.
+    try:
+        manifest_path.parent.mkdir(parents=True, exist_ok=True)
+        manifest_path.write_text(json.dumps(manifest))
+    except OSError:
+        pass
+
+    return plugin_names
 
 
 def parse_req_txt(path):
@@ -38,24 +94,13 @@ def parse_req_txt(path):
     than other dependency management systems, which write to various requirements
     files whenever a package is installed.
 
+    Files included with -r are parsed as well. See req_txt_parser.
+
     Returns:
         List[str]: List of strings representing each requirement.
     """
-    lines = path.read_text().splitlines()
-
-    # Remove blank lines, extra whitespace, and comments.
-    lines = [l.strip() for l in lines if l]
-    lines = [l for l in lines if l[0] != "#"]
-
-    # Parse requirements file, without including version information.
-    req_re = r"^([a-zA-Z0-9_\-]*)"
-    requirements = []
-    for line in lines:
-        m = re.search(req_re, line)
-        if m:
-            requirements.append(m.group(1))
-
-    return requirements
+    parsed = parse_req_txt_files(path)
+    return [requirement.name for requirement in parsed.requirements]
 
 
 def parse_pipfile(path):
@@ -102,48 +147,16 @@ def parse_pyproject_toml(path):
     return requirements
 
 
-def check_status_output(status_output, diff_output):
-    """Check output of `git status --porcelain` for uncommitted changes.
+def check_git_diff(diff_output):
+    """Check output of `git diff --unified=0` for unexpected changes.
 
-    Look for:
-        Untracked changes other than dsd_logs/
-        Modified files beyond .gitignore and settings.py
-    Consider looking at other status codes at some point.
+    Changes to settings.py and .gitignore are acceptable, as long as they only
+    include work done by django-simple-deploy. The output may include several
+    changed files.
 
     Returns:
         bool: True if okay to proceed, False if not.
     """
-    lines = status_output.splitlines()
-    lines = [line.strip() for line in lines]
-
-    # Process untracked changes first.
-    untracked_changes = [line for line in lines if line[0:2] == "??"]
-
-    if len(untracked_changes) > 1:
-        return False
-    if len(untracked_changes) == 1 and "dsd_logs/" not in untracked_changes[0]:
-        return False
-
-    # Process modified files.
-    modified_files = [line.replace("M ", "") for line in lines if line[0] == "M"]
-    modified_paths = [Path(f) for f in modified_files]
-    allowed_modifications = ["settings.py", ".gitignore"]
-    # Return False if any files other than these have been modified.
-    if any([path.name not in allowed_modifications for path in modified_paths]):
-        return False
-
-    if not _check_git_diff(diff_output):
-        return False
-
-    # No reason not to continue.
-    return True
-
-
-# --- Helper functions ---
-
-
-def _check_git_diff(diff_output):
-    """Check git diff output, which may include several changed files."""
     file_diffs = diff_output.split("\ndiff ")
     for diff in file_diffs:
         diff_lines = diff.split("\n")
@@ -157,6 +170,9 @@ def _check_git_diff(diff_output):
     return True
 
 
+# --- Helper functions ---
+
+
 def _check_settings_diff(diff_lines):
     """Look for any unexpected changes in settings.py.
 
@@ -222,11 +238,60 @@ def _get_plugin_name_from_packages(available_packages):
 
     This is broken into a helper function to make testing easier.
     """
-    # Get possible plugin names.
+    plugin_names = _filter_plugin_packages(available_packages)
+    return _select_plugin_name(plugin_names)
+
+
+def _filter_plugin_packages(available_packages):
+    """Get the packages that look like plugins, from a list of package names."""
     plugin_prefix = f"dsd_"
-    plugin_names = [
-        pkg_name for pkg_name in available_packages if plugin_prefix in pkg_name
-    ]
+    return [pkg_name for pkg_name in available_packages if plugin_prefix in pkg_name]
+
+
+def _scan_for_plugin_names():
+    """Scan installed distributions for plugins.
+
+    Plugins should register an entry point in the `django_simple_deploy` group.
+    Plugins that predate the entry point are found by their `dsd_` package prefix.
+    """
+    try:
+        plugin_eps = entry_points(group=PLUGIN_ENTRY_POINT_GROUP)
+    except TypeError:
+        # Python 3.9 doesn't support selecting entry points by group.
+        plugin_eps = entry_points().get(PLUGIN_ENTRY_POINT_GROUP, [])
+
+    plugin_names = [ep.module.split(".")[0] for ep in plugin_eps]
+    plugin_names += _filter_plugin_packages(packages_distributions().keys())
+
+    # Remove duplicates, but keep the order plugins were found in.
+    return list(dict.fromkeys(plugin_names))
+
+
+def _get_site_packages_key():
+    """Get the mtimes of all site-packages directories on sys.path."""
+    key = []
+    for path in sys.path:
+        if Path(path).name not in ("site-packages", "dist-packages"):
+            continue
+        try:
+            key.append([path, os.stat(path).st_mtime_ns])
+        except OSError:
+            continue
+
+    return key
+
+
+def _get_plugin_manifest_path(cache_dir=None):
+    """Get the path to the plugin manifest."""
+    if cache_dir is None:
+        cache_root = os.environ.get("XDG_CACHE_HOME") or Path.home() / ".cache"
+        cache_dir = Path(cache_root) / "django-simple-deploy"
+
+    return Path(cache_dir) / PLUGIN_MANIFEST_FILENAME
+
+
+def _select_plugin_name(plugin_names):
+    """Get the name of the plugin to use, from the names of installed plugins."""
     if len(plugin_names) == 0:
         msg = f"Could not find any plugins. Officially-supported plugins are:" ""
         msg += "\n  dsd-flyio dsd-upsun dsd-heroku"
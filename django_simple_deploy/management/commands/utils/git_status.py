@@ -0,0 +1,200 @@
+"""Stream and check `git status` output.
+
+`git status --porcelain=v2 -z` is read from the pipe as git produces it, and parsed one
+NUL-delimited entry at a time. A single disqualifying entry is enough to know the
+project isn't in an acceptable state, so git is stopped as soon as one is seen. This
+keeps the check fast in repos with large numbers of untracked files.
+
+Entries are NUL-delimited, so paths are never quoted. Renamed and copied entries carry
+their original path in a separate field.
+
+See: https://git-scm.com/docs/git-status#_porcelain_format_version_2
+"""
+
+import os
+import subprocess
+from dataclasses import dataclass
+from pathlib import Path
+from typing import NamedTuple
+
+
+STATUS_CMD = ["git", "status", "--porcelain=v2", "-z"]
+DIFF_CMD = ["git", "diff", "--unified=0"]
+
+# Uncommitted changes to these files are acceptable; dsd may have made them on an
+# earlier run. Their diffs are checked separately.
+ALLOWED_MODIFICATIONS = ("settings.py", ".gitignore")
+
+CHUNK_SIZE = 64 * 1024
+
+# Number of space-separated fields in each kind of entry. The last field is the path,
+# which may itself contain spaces.
+_NUM_FIELDS = {"1": 9, "2": 10, "u": 11}
+
+
+class StatusEntry(NamedTuple):
+    """A single entry from `git status --porcelain=v2`."""
+
+    # "1" changed, "2" renamed or copied, "u" unmerged, "?" untracked, "!" ignored.
+    kind: str
+    # Staged and unstaged status, ie ".M". Empty for untracked and ignored entries.
+    xy: str
+    path: str
+    orig_path: str = ""
+
+    def __str__(self):
+        entry = " ".join(field for field in (self.kind, self.xy, self.path) if field)
+        if self.orig_path:
+            entry += f" <- {self.orig_path}"
+        return entry
+
+
+@dataclass(frozen=True)
+class GitStatus:
+    """Result of checking git status."""
+
+    # True if no entry ruled out proceeding. The diffs of allowed modifications still
+    # need to be checked.
+    proceed: bool
+
+    # Entries read before a decision was made. If proceed is False, git was stopped
+    # early, and this won't be the full status.
+    entries: tuple = ()
+
+    def __str__(self):
+        return "\n".join(str(entry) for entry in self.entries)
+
+    @property
+    def modified_paths(self):
+        """Paths of modified files, which are all allowed modifications if proceed."""
+        return [entry.path for entry in self.entries if _is_modified(entry)]
+
+
+def get_git_status(cwd=None):
+    """Run git status, and check entries as they're produced.
+
+    Returns:
+        GitStatus
+    """
+    proc = subprocess.Popen(
+        STATUS_CMD, cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL
+    )
+    try:
+        chunks = iter(lambda: proc.stdout.read1(CHUNK_SIZE), b"")
+        status = check_entries(iter_status_entries(chunks))
+    finally:
+        # If a decision was made early, don't wait for git to finish.
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdout.close()
+        proc.wait()
+
+    return status
+
+
+def get_git_diff(paths, cwd=None):
+    """Run `git diff --unified=0`, limited to paths.
+
+    Only allowed modifications need their diffs checked, so there's no need to diff
+    the whole working tree. Paths are relative to the repository root, as reported
+    by git status.
+
+    Returns:
+        str: Diff output, or "" if there are no paths to diff.
+    """
+    if not paths:
+        return ""
+
+    pathspecs = [f":(top,literal){path}" for path in paths]
+    output = subprocess.run(DIFF_CMD + ["--"] + pathspecs, cwd=cwd, capture_output=True)
+    return output.stdout.decode()
+
+
+def iter_status_entries(chunks):
+    """Parse entries from chunks of `git status --porcelain=v2 -z` output.
+
+    Chunks can split entries anywhere; only complete entries are parsed.
+
+    Yields:
+        StatusEntry
+    """
+    buffer = b""
+    renamed_entry = None
+    for chunk in chunks:
+        buffer += chunk
+        *records, buffer = buffer.split(b"\0")
+
+        for record in records:
+            if renamed_entry:
+                # This record is the original path of the previous entry.
+                yield renamed_entry._replace(orig_path=os.fsdecode(record))
+                renamed_entry = None
+                continue
+
+            entry = _parse_record(os.fsdecode(record))
+            if entry is None:
+                continue
+            if entry.kind == "2":
+                renamed_entry = entry
+            else:
+                yield entry
+
+
+def check_entries(entries):
+    """Check status entries, stopping at the first one that rules out proceeding.
+
+    Look for:
+        Untracked changes other than dsd_logs/
+        Modified files beyond .gitignore and settings.py
+    Consider looking at other status codes at some point.
+
+    Returns:
+        GitStatus
+    """
+    seen = []
+    num_untracked = 0
+    for entry in entries:
+        seen.append(entry)
+
+        if entry.kind == "?":
+            num_untracked += 1
+            if num_untracked > 1 or "dsd_logs/" not in entry.path:
+                return GitStatus(False, tuple(seen))
+
+        elif _is_modified(entry):
+            if Path(entry.path).name not in ALLOWED_MODIFICATIONS:
+                return GitStatus(False, tuple(seen))
+
+    return GitStatus(True, tuple(seen))
+
+
+# --- Helper functions ---
+
+
+def _parse_record(record):
+    """Parse a single NUL-delimited record.
+
+    Returns:
+        StatusEntry | None: None for headers and empty records.
+    """
+    kind = record[:1]
+    if kind in ("?", "!"):
+        return StatusEntry(kind, "", record[2:])
+
+    if kind in _NUM_FIELDS:
+        fields = record.split(" ", _NUM_FIELDS[kind] - 1)
+        return StatusEntry(kind, fields[1], fields[-1])
+
+    # Header lines (only present with --branch), or trailing empty record.
+    return None
+
+
+def _is_modified(entry):
+    """Check if an entry is a modified file.
+
+    Matches the original porcelain v1 check: the first status code that isn't
+    "unmodified" is M.
+    """
+    if entry.kind != "1":
+        return False
+    return entry.xy.lstrip(".")[:1] == "M"
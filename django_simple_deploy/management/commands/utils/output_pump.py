@@ -0,0 +1,158 @@
+"""Stream a process's stdout and stderr at the same time.
+
+Reading one pipe to the end before reading the other can deadlock: if the process
+fills the pipe that isn't being read, it blocks, and the pipe that is being read never
+reaches its end. Here each pipe gets its own reader thread. The calling thread hands
+lines to a callback, so callbacks never run in a reader thread.
+
+Readers timestamp each line and buffer it while holding a shared lock, and the calling
+thread always takes the oldest buffered line. Any line that hasn't been buffered yet
+will get a later timestamp, so lines are handed over in timestamp order across
+streams.
+
+If there's no output for a while, the caller can be told with an `on_idle` callback,
+for example to show a heartbeat or stop a process that's stalled. After killing a
+process, the caller can set a `stop` event to stop pumping right away. Otherwise, a
+child process that inherited the pipes could keep them open, and the pump would
+wait for it to exit. Readers work on duplicates of the pipes' file descriptors, so
+the caller can close the pipes while a reader is still blocked on one.
+
+Each stream's buffer is bounded. If the callback falls behind, readers wait, the pipes
+fill, and the process waits, so memory use stays flat no matter how much output there
+is.
+"""
+
+import io
+import os
+import threading
+import time
+from collections import deque
+from typing import NamedTuple
+
+
+# Maximum number of lines buffered for each stream.
+MAX_BUFFERED_LINES = 1000
+
+# How often to check the stop event, in seconds, while waiting for output.
+_STOP_POLL_INTERVAL = 0.1
+
+
+class OutputLine(NamedTuple):
+    """A line of output, and when it was read."""
+
+    timestamp: float
+    stream: str
+    text: str
+
+
+def pump_output(
+    streams,
+    on_line,
+    max_buffered_lines=MAX_BUFFERED_LINES,
+    idle_timeout=None,
+    on_idle=None,
+    stop=None,
+):
+    """Read lines from several binary pipes at once, until all of them close.
+
+    Args:
+        streams: Dict of stream names to pipes, ie {"stdout": p.stdout}. Pipes that are
+            None are skipped.
+        on_line: Called with an OutputLine for every line read.
+        max_buffered_lines: Number of lines each stream can buffer before its reader
+            waits.
+        idle_timeout: Seconds without output before on_idle() is called. It's called
+            again after each further idle_timeout seconds without output.
+        on_idle: Called with the number of seconds since the last line, or since
+            the pump started.
+        stop: Optional threading.Event. Once it's set, lines that are already
+            buffered are handed over, and then the pump returns without waiting for
+            the pipes to close.
+
+    Returns:
+        None
+    """
+    streams = {name: pipe for name, pipe in streams.items() if pipe is not None}
+    buffers = {name: deque() for name in streams}
+    open_streams = set(streams)
+    changed = threading.Condition()
+    # Set when the pump returns. Readers that are still running keep draining their
+    # pipes, so the process doesn't block, but lines are dropped.
+    stopped = threading.Event()
+
+    def add_line(name, text):
+        buffer = buffers[name]
+        with changed:
+            while len(buffer) >= max_buffered_lines and not stopped.is_set():
+                changed.wait()
+            buffer.append(OutputLine(time.monotonic(), name, text))
+            changed.notify_all()
+
+    def read_lines(name, fd):
+        try:
+            with io.open(fd, "rb") as pipe:
+                for text in io.TextIOWrapper(pipe, encoding="utf-8", errors="replace"):
+                    if not stopped.is_set():
+                        add_line(name, text)
+        finally:
+            with changed:
+                open_streams.discard(name)
+                changed.notify_all()
+
+    readers = [
+        threading.Thread(
+            target=read_lines, args=(name, os.dup(pipe.fileno())), daemon=True
+        )
+        for name, pipe in streams.items()
+    ]
+    for reader in readers:
+        reader.start()
+
+    if on_idle is None:
+        idle_timeout = None
+    last_output = time.monotonic()
+    next_idle = last_output + idle_timeout if idle_timeout is not None else None
+    poll_interval = _STOP_POLL_INTERVAL if stop is not None else None
+
+    try:
+        while True:
+            line = None
+            idle = False
+            with changed:
+                while open_streams and not any(buffers.values()):
+                    if stop is not None and stop.is_set():
+                        break
+                    wait_time = poll_interval
+                    if next_idle is not None:
+                        remaining = next_idle - time.monotonic()
+                        if remaining <= 0:
+                            idle = True
+                            break
+                        wait_time = min(remaining, wait_time or remaining)
+                    changed.wait(wait_time)
+
+                heads = [buffer for buffer in buffers.values() if buffer]
+                if heads:
+                    line = min(heads, key=lambda buffer: buffer[0].timestamp).popleft()
+                    changed.notify_all()
+                elif not idle:
+                    # All pipes are closed, or pumping was stopped.
+                    break
+
+            if line is not None:
+                last_output = line.timestamp
+                if idle_timeout is not None:
+                    next_idle = last_output + idle_timeout
+                on_line(line)
+            else:
+                on_idle(time.monotonic() - last_output)
+                next_idle = time.monotonic() + idle_timeout
+    finally:
+        # Readers that are still running drop anything else they read.
+        with changed:
+            stopped.set()
+            changed.notify_all()
+
+    if stop is None or not stop.is_set():
+        for reader in readers:
+            reader.join()
@@ -3,21 +3,35 @@
 Note: Some of these utilities are used by django-simple-deploy internally as well.
 """
 
-import io
+import asyncio
 import logging
+import os
 import re
 import subprocess
 import shlex
+import signal
 import sys
+import threading
+import time
 import toml
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
 
-from django.template.engine import Engine, Context
+from django.template.engine import Context
 from django.utils.safestring import mark_safe
 
 from .. import dsd_messages
+from . import async_commands
+from . import output_pump
+from . import toml_editor
 from .dsd_config import DSDConfig
 from .command_errors import DSDCommandError
+from .settings_blocks import SettingsBlocks
+from .retry_policy import RetryPolicy
+from . import template_cache
+from . import text_filters
 
 
 # Create dsd_config once right here. The attributes are set in deploy.py,
@@ -25,6 +39,70 @@ from .command_errors import DSDCommandError
 # instance between core, plugins, and these utility functions.
 dsd_config = DSDConfig()
 
+# Packages added while batch_requirements() is active, as (package, version) tuples.
+# None when no batch is active.
+_pending_requirements = None
+
+# Table holding the optional deploy group in a Poetry pyproject.toml file.
+_DEPLOY_GROUP_TABLE = ("tool", "poetry", "group", "deploy")
+
+# Most recent index of settings blocks, and the start lines it was built with.
+_settings_index = None
+
+# Settings blocks added by add_settings_block() in this run, keyed by settings path
+# and template path. Values are the offset where the block starts, and the block
+# itself.
+_settings_blocks = {}
+
+# Number of threads used to render templates in render_files().
+_RENDER_WORKERS = 4
+
+# Subcommands that only read information, and subcommands that change something.
+# Quick commands are run in plan mode if they use a read-only subcommand, and no
+# subcommand that changes something.
+_READ_ONLY_SUBCOMMANDS = {
+    "--version",
+    "version",
+    "whoami",
+    "list",
+    "ls",
+    "status",
+    "show",
+    "info",
+    "get",
+    "describe",
+    "regions",
+}
+_WRITE_SUBCOMMANDS = {
+    "create",
+    "set",
+    "unset",
+    "add",
+    "attach",
+    "detach",
+    "delete",
+    "destroy",
+    "remove",
+    "rm",
+    "deploy",
+    "push",
+    "commit",
+    "init",
+    "login",
+    "logout",
+    "open",
+    "restart",
+    "scale",
+    "update",
+}
+
+# What run_slow_command() can do when a command stops writing output.
+_STALL_POLICIES = ("wait", "kill", "retry")
+
+# Number of recent stderr lines kept from a slow command, to match against a
+# RetryPolicy's stderr patterns.
+_STDERR_LINES_KEPT = 200
+
 
 def add_file(path, contents):
     """Add a new file to the project.
@@ -34,7 +112,8 @@ def add_file(path, contents):
     Dockerfile. See the `add_dockerfile()` method in Fly.io's deployer module.
 
     If the file does not exist, it is written to the project. If the file already
-    exists, the user is prompted for permission to overwrite the file.
+    exists, the user is prompted for permission to overwrite the file. If the existing
+    file already has these contents, it's left alone.
 
     Returns:
     - None
@@ -46,7 +125,13 @@ def add_file(path, contents):
 
     write_output(f"\n  Looking in {path.parent} for {path.name}...")
 
-    if path.exists():
+    if _file_exists(path):
+        # Rewriting identical contents would only bump the file's mtime.
+        if _is_unchanged(path, contents):
+            write_output(f"    Found {path.name}, with no changes needed.")
+            dsd_config.unchanged_files.append(path)
+            return
+
         proceed = get_confirmation(dsd_messages.file_found(path.name))
         if not proceed:
             raise DSDCommandError(dsd_messages.file_replace_rejected(path.name))
@@ -54,7 +139,7 @@ def add_file(path, contents):
         write_output(f"    File {path.name} not found. Generating file...")
 
     # File does not exist, or we are free to overwrite it.
-    path.write_text(contents)
+    _write_file(path, contents)
 
     msg = f"\n    Wrote {path.name} to {path}"
     write_output(msg)
@@ -67,6 +152,8 @@ def modify_file(path, contents):
     settings.py. We're not getting permission; if unwanted changes are somehow made,
     the user can use Git to restore the file to its original state.
 
+    If the file already has these contents, it's not rewritten.
+
     Returns:
     - None
 
@@ -74,12 +161,17 @@ def modify_file(path, contents):
     - DSDCommandError: If file does not exist.
     """
     # Make sure file exists.
-    if not path.exists():
+    if not _file_exists(path):
         msg = f"File {path.as_posix()} does not exist."
         raise DSDCommandError(msg)
 
+    if _is_unchanged(path, contents):
+        write_output(f"  No changes needed: {path.as_posix()}")
+        dsd_config.unchanged_files.append(path)
+        return
+
     # Rewrite file with new contents.
-    path.write_text(contents)
+    _write_file(path, contents)
     msg = f"  Modified file: {path.as_posix()}"
     write_output(msg)
 
@@ -89,20 +181,48 @@ def modify_settings_file(template_path, context=None):
 
     Provide a path to a template including current settings and the platform-specific
     settings block, and a context dictionary.
+
+    Most templates start with {{ current_settings }}, followed by the block. Only the
+    block needs to go through the template engine in that case; it's rendered, and
+    appended to the current settings. Each call appends a block, even if a block
+    was added earlier in the run.
     """
     if context is None:
         context = {}
+
+    template_file = template_cache.get_template(template_path)
+    settings_string = _read_file(dsd_config.settings_path)
+
+    if template_file.settings_block is not None:
+        block = template_file.settings_block.render(Context(context))
+        modify_file(dsd_config.settings_path, settings_string + block)
+        return
+
     # Add current settings to context.
-    settings_string = dsd_config.settings_path.read_text()
     safe_settings_string = mark_safe(settings_string)
     context["current_settings"] = safe_settings_string
 
-    modified_settings_string = get_template_string(template_path, context)
+    modified_settings_string = template_file.template.render(Context(context))
 
     # Write settings to file.
     modify_file(dsd_config.settings_path, modified_settings_string)
 
 
+def add_settings_block(template_path, context=None):
+    """Add a platform-specific settings block to the end of settings.py.
+
+    The template should only contain the platform-specific block, without
+    {{ current_settings }}. The rest of settings.py doesn't go through the template
+    engine.
+
+    If this is called again in the same run with the same template, the block that
+    template added is replaced in place. Blocks from other templates are left alone.
+    """
+    block = get_template_string(template_path, context or {})
+    settings_string = _read_file(dsd_config.settings_path)
+    _write_settings_block(settings_string, block, Path(template_path).resolve())
+
+
 def add_dir(path):
     """Write a new directory to the file.
 
@@ -117,10 +237,14 @@ def add_dir(path):
     """
     write_output(f"\n  Looking for {path.as_posix()}...")
 
-    if path.exists():
+    change_set = dsd_config.change_set
+    if path.exists() or (change_set is not None and path in change_set.dirs):
         write_output(f"    Found {path.as_posix()}")
     else:
-        path.mkdir()
+        if dsd_config.change_set is not None:
+            dsd_config.change_set.add_dir(path)
+        else:
+            path.mkdir()
         write_output(f"    Added new directory: {path.as_posix()}")
 
 
@@ -159,7 +283,9 @@ def get_numbered_choice(prompt, valid_choices, quit_message):
         return selection
 
 
-def run_quick_command(cmd, check=False, skip_logging=False):
+def run_quick_command(
+    cmd, check=False, skip_logging=False, timeout=None, retry=None, read_only=None
+):
     """Run a command that should finish quickly.
 
     Commands that should finish quickly can be run more simply than commands that
@@ -172,55 +298,224 @@ def run_quick_command(cmd, check=False, skip_logging=False):
     callers will only check stderr, or maybe the returncode; they won't need to
     involve exception handling.
 
+    If `timeout` is given, the command is killed if it hasn't finished after that
+    many seconds. If a `RetryPolicy` is passed as `retry`, failures that match the
+    policy are retried, after a delay.
+
+    In plan mode, commands that only read information, such as `fly auth whoami` or
+    `heroku apps:info`, are still run, so plugins can parse their output. Other
+    commands are recorded instead of being run, and return empty output. Pass
+    `read_only=True` or `read_only=False` if the command's subcommand doesn't make
+    this clear. Plugins can also check `dsd_config.plan` before parsing the output of
+    a command that changes something.
+
     Returns:
         CompletedProcess
 
     Raises:
         CalledProcessError: If check=True is passed, will raise CalledProcessError
         instead of returning a CompletedProcess instance with an error code set.
+        TimeoutExpired: If the command doesn't finish within `timeout` seconds.
     """
     if not skip_logging:
         log_info(f"\n{cmd}")
 
-    if dsd_config.on_windows:
-        output = subprocess.run(cmd, shell=True, capture_output=True)
-    else:
-        cmd_parts = shlex.split(cmd)
-        output = subprocess.run(cmd_parts, capture_output=True, check=check)
+    if dsd_config.planned_commands is not None and not _is_read_only(cmd, read_only):
+        _plan_command(cmd, skip_logging)
+        return subprocess.CompletedProcess(cmd, 0, stdout=b"", stderr=b"")
+
+    # The command may depend on changes made so far, or change project files itself.
+    commit_staged_changes()
+    try:
+        attempt = 1
+        while True:
+            try:
+                output = _run_quick_command_once(cmd, check, timeout)
+            except subprocess.CalledProcessError as e:
+                if not _retry_command(cmd, e.returncode, e.stderr, retry, attempt):
+                    raise
+            else:
+                if not _retry_command(
+                    cmd, output.returncode, output.stderr, retry, attempt
+                ):
+                    break
+            attempt += 1
+    finally:
+        _reload_project_snapshot()
 
     return output
 
 
-def run_slow_command(cmd, skip_logging=False):
+def run_slow_command(
+    cmd,
+    skip_logging=False,
+    timeout=None,
+    stall_timeout=None,
+    on_stall="wait",
+    retry=None,
+):
     """Run a command that may take some time.
 
     For commands that may take a while, we need to stream output to the user, rather
     than just capturing it. Otherwise, the command will appear to hang.
+
+    Output written to stdout and stderr is streamed as it arrives, and logged.
+
+    If `timeout` is given, the command is killed if it hasn't finished after that
+    many seconds. If `stall_timeout` is given, a command that writes no output for
+    that many seconds is considered stalled, and `on_stall` decides what happens:
+    - "wait": Show a heartbeat with the elapsed time, and keep waiting. A heartbeat
+      is shown after each stall_timeout seconds without output.
+    - "kill": Kill the command.
+    - "retry": Kill the command, and run it once more. If it stalls again, it's
+      killed.
+
+    If a `RetryPolicy` is passed as `retry`, failures that match the policy are
+    retried, after a delay. Stderr patterns are matched against the most recent
+    lines the command wrote to stderr.
+
+    Raises:
+        CalledProcessError: If the command fails.
+        TimeoutExpired: If the command is killed for taking too long, or stalling.
+        ValueError: If on_stall isn't one of the values above.
     """
+    if on_stall not in _STALL_POLICIES:
+        raise ValueError(f"on_stall must be one of {', '.join(_STALL_POLICIES)}.")
 
-    # DEV: This only captures stderr right now.
-    # The first call I used this for was `git push heroku`. That call writes to
-    # stderr; I believe streaming to stdout and stderr requires multithreading. The
-    # current approach seems to be working for all calls that use it.
-    #
-    # Adding a parameter stdout=subprocess.PIPE and adding a separate identical loop
-    # over p.stdout misses stderr. Maybe combine the loops with zip()? SO posts on
-    # this topic date back to Python2/3 days.
     if not skip_logging:
         log_info(f"\n{cmd}")
 
-    cmd_parts = cmd.split()
-    with subprocess.Popen(
-        cmd_parts,
-        stderr=subprocess.PIPE,
-        text=False,
-        shell=dsd_config.use_shell,
-    ) as p:
-        for line in io.TextIOWrapper(p.stderr, encoding="utf-8", errors="replace"):
-            write_output(line, skip_logging=skip_logging)
+    if dsd_config.planned_commands is not None:
+        _plan_command(cmd, skip_logging)
+        return
+
+    commit_staged_changes()
+    try:
+        attempt = 1
+        stall_retried = False
+        while True:
+            returncode, killed_for, stderr = _stream_command(
+                cmd, skip_logging, timeout, stall_timeout, on_stall
+            )
+            if killed_for == "stall" and on_stall == "retry" and not stall_retried:
+                stall_retried = True
+                write_output(f"\n  Running {cmd.split()[0]} again...")
+                continue
+            if killed_for is not None or not _retry_command(
+                cmd, returncode, stderr, retry, attempt
+            ):
+                break
+            attempt += 1
+    finally:
+        _reload_project_snapshot()
+
+    if killed_for == "timeout":
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    if killed_for == "stall":
+        raise subprocess.TimeoutExpired(cmd, stall_timeout)
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd.split())
+
+
+async def async_run_quick_command(
+    cmd, check=False, skip_logging=False, timeout=None, read_only=None
+):
+    """Run a command that should finish quickly, without blocking the event loop.
+
+    This behaves like `run_quick_command()`, but several commands can run at once.
+    For example:
+
+        auth_output, apps_output = await asyncio.gather(
+            plugin_utils.async_run_quick_command("fly auth whoami"),
+            plugin_utils.async_run_quick_command("fly apps list --json"),
+        )
+
+    The number of commands running at once is limited. If the task is cancelled, or
+    the command doesn't finish within `timeout` seconds, the command's process is
+    killed; processes it started aren't. Failed commands aren't retried. In plan
+    mode, read-only commands are run as they are in `run_quick_command()`.
+
+    Returns:
+        CompletedProcess
+
+    Raises:
+        CalledProcessError: If check=True is passed, and the command fails.
+        TimeoutExpired: If the command doesn't finish within `timeout` seconds.
+    """
+    if not skip_logging:
+        log_info(f"\n{cmd}")
+
+    if dsd_config.planned_commands is not None and not _is_read_only(cmd, read_only):
+        _plan_command(cmd, skip_logging)
+        return subprocess.CompletedProcess(cmd, 0, stdout=b"", stderr=b"")
+
+    commit_staged_changes()
+    try:
+        output = await asyncio.wait_for(
+            async_commands.run_captured(cmd, use_shell=bool(dsd_config.on_windows)),
+            timeout,
+        )
+    except asyncio.TimeoutError:
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    finally:
+        _reload_project_snapshot()
+
+    if check:
+        output.check_returncode()
+    return output
+
+
+async def async_run_slow_command(cmd, skip_logging=False):
+    """Run a command that may take some time, without blocking the event loop.
+
+    This behaves like `run_slow_command()`; output written to stdout and stderr is
+    streamed to the user. If several slow commands run at once, their output is
+    interleaved. There's no timeout, stall handling, or retry.
+
+    Raises:
+        CalledProcessError: If the command fails.
+    """
+    if not skip_logging:
+        log_info(f"\n{cmd}")
+
+    if dsd_config.planned_commands is not None:
+        _plan_command(cmd, skip_logging)
+        return
+
+    def on_line(line):
+        write_output(line, skip_logging=skip_logging)
+
+    commit_staged_changes()
+    try:
+        returncode = await async_commands.run_streamed(
+            cmd, on_line, use_shell=bool(dsd_config.use_shell)
+        )
+    finally:
+        _reload_project_snapshot()
+
+    if returncode != 0:
+        raise subprocess.CalledProcessError(returncode, cmd.split())
+
+
+def run_commands_concurrently(cmds, check=False, skip_logging=False):
+    """Run several quick commands at once, from code that isn't async.
+
+    If one command fails with check=True, or the user presses Ctrl-C, commands that
+    are still running are killed.
+
+    Returns:
+        list: A CompletedProcess for each command, in the order of cmds.
+
+    Raises:
+        CalledProcessError: If check=True is passed, and any command fails.
+    """
 
-    if p.returncode != 0:
-        raise subprocess.CalledProcessError(p.returncode, p.args)
+    async def run_all():
+        return await asyncio.gather(
+            *(async_run_quick_command(cmd, check, skip_logging) for cmd in cmds)
+        )
+
+    return asyncio.run(run_all())
 
 
 def get_confirmation(msg="Are you sure you want to do this?", skip_logging=False):
@@ -249,6 +544,13 @@ def get_confirmation(msg="Are you sure you want to do this?", skip_logging=False
         write_output(msg, skip_logging=skip_logging)
         return True
 
+    # Nothing is changed in plan mode, so there's nothing to confirm.
+    if dsd_config.plan:
+        write_output(prompt, skip_logging=skip_logging)
+        msg = "  Confirmed for plan..."
+        write_output(msg, skip_logging=skip_logging)
+        return True
+
     while True:
         write_output(prompt, skip_logging=skip_logging)
         confirmed = input()
@@ -277,12 +579,9 @@ def check_settings(platform_name, start_line, msg_found, msg_cant_overwrite):
         DSDCommandError: If we can't overwrite existing platform-specific
         settings block.
     """
-    settings_text = dsd_config.settings_path.read_text()
+    blocks = _get_settings_blocks({platform_name: start_line})
 
-    re_platform_settings = f"(.*)({start_line})(.*)"
-    m = re.match(re_platform_settings, settings_text, re.DOTALL)
-
-    if not m:
+    if platform_name not in blocks:
         log_info(f"No {platform_name}-specific settings block found.")
         return
 
@@ -291,12 +590,56 @@ def check_settings(platform_name, start_line, msg_found, msg_cant_overwrite):
         raise DSDCommandError(msg_cant_overwrite)
 
     # Platform-specific settings exist, but we can remove them and start fresh.
-    dsd_config.settings_path.write_text(m.group(1))
+    _write_file(dsd_config.settings_path, blocks.remove(platform_name))
 
     msg = f"  Removed existing {platform_name}-specific settings block."
     write_output(msg)
 
 
+def get_settings_block(name, start_line=None):
+    """Get the text of a dsd-managed settings block.
+
+    Blocks written by replace_settings_block() are found by their markers. For blocks
+    written by appending a template to settings.py, pass the block's first line, ie
+    "# Fly.io settings.".
+
+    Returns:
+        str | None: Text of the block, or None if it's not in settings.py.
+    """
+    start_lines = {name: start_line} if start_line else None
+    return _get_settings_blocks(start_lines).get_text(name)
+
+
+def replace_settings_block(name, contents, start_line=None):
+    """Replace a dsd-managed settings block, or add it to the end of settings.py.
+
+    The block is wrapped in begin and end markers, so it can be found and replaced
+    on later runs. Pass start_line to replace an older block that doesn't have
+    markers.
+
+    Returns:
+        None
+    """
+    start_lines = {name: start_line} if start_line else None
+    blocks = _get_settings_blocks(start_lines)
+    modify_file(dsd_config.settings_path, blocks.replace(name, contents))
+
+
+def remove_settings_block(name, start_line=None):
+    """Remove a dsd-managed settings block, if it's present.
+
+    Returns:
+        bool: True if a block was removed.
+    """
+    start_lines = {name: start_line} if start_line else None
+    blocks = _get_settings_blocks(start_lines)
+    if name not in blocks:
+        return False
+
+    modify_file(dsd_config.settings_path, blocks.remove(name))
+    return True
+
+
 def write_output(output, write_to_console=True, skip_logging=False):
     """Write output to the appropriate places.
 
@@ -360,6 +703,26 @@ def commit_changes():
     write_output(output)
 
 
+def commit_staged_changes():
+    """Write all staged changes to the project.
+
+    Changes made through these utilities are staged in dsd_config.change_set, and
+    written when the run finishes. They're also written before any command is run.
+    Call this if the plugin needs to see changes on disk at some other point. In plan
+    mode, nothing is written.
+
+    Returns:
+        list: Paths that were written.
+    """
+    if dsd_config.change_set is None or dsd_config.change_set.dry_run:
+        return []
+
+    paths = dsd_config.change_set.commit()
+    for path in paths:
+        log_info(f"  Wrote staged changes to {path.as_posix()}")
+    return paths
+
+
 def add_packages(package_list):
     """Add a set of packages to the project's requirements.
 
@@ -370,8 +733,9 @@ def add_packages(package_list):
     Returns:
         None
     """
-    for package in package_list:
-        add_package(package)
+    with batch_requirements():
+        for package in package_list:
+            add_package(package)
 
 
 def add_package(package_name, version=""):
@@ -391,30 +755,151 @@ def add_package(package_name, version=""):
         write_output(f"  Found {package_name} in requirements file.")
         return
 
-    if dsd_config.pkg_manager == "pipenv":
-        add_pipenv_pkg(dsd_config.pipfile_path, package_name, version)
-    elif dsd_config.pkg_manager == "poetry":
-        _check_poetry_deploy_group()
-        add_poetry_pkg(dsd_config.pyprojecttoml_path, package_name, version)
-    else:
-        add_req_txt_pkg(dsd_config.req_txt_path, package_name, version)
+    with batch_requirements():
+        if dsd_config.pkg_manager == "poetry":
+            _check_poetry_deploy_group()
+        _pending_requirements.append((package_name, version))
 
+    dsd_config.requirements.add(f"{package_name}{version}")
     write_output(f"  Added {package_name} to requirements file.")
 
 
+@contextmanager
+def batch_requirements():
+    """Write packages added in this block to the requirements file all at once.
+
+    The dependency file is read and written once, no matter how many packages are
+    added. add_packages() does this automatically; use this when calling add_package()
+    several times:
+        with plugin_utils.batch_requirements():
+            plugin_utils.add_package("psycopg2", version="<2.9")
+            plugin_utils.add_package("gunicorn")
+
+    Nested blocks are part of the outermost block. Packages are written even if the
+    block raises an exception, as they would be if they were added one at a time.
+    """
+    global _pending_requirements
+    if _pending_requirements is not None:
+        yield
+        return
+
+    _pending_requirements = []
+    try:
+        yield
+    finally:
+        pending, _pending_requirements = _pending_requirements, None
+        _write_requirements(pending)
+
+
 def get_template_string(template_path, context):
     """Given a template and context, return contents as a string.
 
-    Contents can then be written to a file.
+    Contents can then be written to a file. Compiled templates are cached, so
+    rendering the same template again only re-reads it if it's changed.
 
     Returns:
     - Str: single string representing contents of the rendered template.
     """
-    my_engine = Engine()
-    template = my_engine.from_string(template_path.read_text())
+    template = template_cache.get_template(template_path).template
     return template.render(Context(context))
 
 
+def prewarm_templates(template_paths):
+    """Compile templates ahead of time.
+
+    Templates are compiled the first time they're rendered, and reused after that.
+    Call this with the templates a plugin uses, to compile them up front.
+
+    Returns:
+        None
+    """
+    for template_path in template_paths:
+        template_cache.get_template(template_path).template
+
+
+def render_to_file(template_path, path, context=None, filters=None):
+    """Render a template, clean up the output, and add it to the project as a file.
+
+    The rendered output goes through a chain of filters from `text_filters`, in a
+    single pass. By default, trailing whitespace is removed, doubled blank lines are
+    collapsed, and the file ends with a newline. Pass `filters=()` to write the
+    output as rendered.
+
+    The file is written with `add_file()`, so the user is asked before an existing
+    file is overwritten.
+
+    Returns:
+    - None
+
+    Raises:
+    - DSDCommandError: If file exists, and user does not give permission
+    to overwrite file.
+    """
+    if filters is None:
+        filters = text_filters.DEFAULT_FILTERS
+
+    template = template_cache.get_template(template_path).template
+    rendered = template.render(Context(context or {}))
+    contents = "".join(text_filters.apply_filters(rendered, filters))
+
+    add_file(path, contents)
+
+
+def render_files(jobs, filters=None):
+    """Render several templates, and add them to the project as files.
+
+    Each job is a tuple of (template_path, path, context), the same arguments that
+    `render_to_file()` takes. Templates are rendered concurrently, and each output
+    goes through the same filters as `render_to_file()`. If any of the files already
+    exist with different contents, the user is asked once for permission to replace
+    all of them. Files that already have the rendered contents are left alone.
+
+    Nothing is written unless every template renders, and permission is granted.
+
+    Returns:
+    - list: Paths that were written.
+
+    Raises:
+    - DSDCommandError: If any file exists, and user does not give permission
+    to overwrite it.
+    """
+    if filters is None:
+        filters = text_filters.DEFAULT_FILTERS
+    jobs = list(jobs)
+
+    def render(job):
+        template_path, _path, context = job
+        template = template_cache.get_template(template_path).template
+        rendered = template.render(Context(context or {}))
+        return "".join(text_filters.apply_filters(rendered, filters))
+
+    with ThreadPoolExecutor(max_workers=_RENDER_WORKERS) as executor:
+        all_contents = list(executor.map(render, jobs))
+
+    new_files, replaced_files = [], []
+    for (_template_path, path, _context), contents in zip(jobs, all_contents):
+        if not _file_exists(path):
+            new_files.append((path, contents))
+        elif _is_unchanged(path, contents):
+            write_output(f"  Found {path.name}, with no changes needed.")
+            dsd_config.unchanged_files.append(path)
+        else:
+            replaced_files.append((path, contents))
+
+    if replaced_files:
+        names = [path.name for path, _contents in replaced_files]
+        if not get_confirmation(dsd_messages.files_found(names)):
+            raise DSDCommandError(dsd_messages.files_replace_rejected(names))
+
+    written_paths = []
+    for path, contents in new_files + replaced_files:
+        _write_file(path, contents)
+        write_output(f"  Wrote {path.name} to {path}")
+        written_paths.append(path)
+
+    return written_paths
+
+
 def remove_doubled_blank_lines(contents):
     """Remove doubled blank lines from a content string.
 
@@ -425,10 +910,7 @@ def remove_doubled_blank_lines(contents):
     get_template_string(), you could never have intentional double blank
     lines in rendered templates.
     """
-    while "\n\n\n" in contents:
-        contents = contents.replace("\n\n\n", "\n\n")
-
-    return contents
+    return re.sub(r"\n{3,}", "\n\n", contents)
 
 
 def read_log():
@@ -487,6 +969,340 @@ def get_string_from_output(output):
         return output_str
 
 
+def _read_file(path):
+    """Read a project file, including staged changes.
+
+    Uses the project snapshot if the file is in it.
+    """
+    change_set = dsd_config.change_set
+    if change_set is not None and path in change_set:
+        return change_set.read_text(path)
+
+    snapshot = dsd_config.project_snapshot
+    if snapshot is not None and path in snapshot:
+        return snapshot.read_text(path)
+    return path.read_text()
+
+
+def _load_toml(path):
+    """Parse a project TOML file, including staged changes.
+
+    Uses the project snapshot if the file is in it.
+    """
+    snapshot = dsd_config.project_snapshot
+    if snapshot is not None and path in snapshot:
+        return snapshot.load_toml(path)
+
+    change_set = dsd_config.change_set
+    if change_set is not None and path in change_set:
+        return toml.loads(change_set.read_text(path))
+    return toml.load(path)
+
+
+def _file_exists(path):
+    """Check whether a project file exists, using the project snapshot if possible."""
+    change_set = dsd_config.change_set
+    if change_set is not None and path in change_set:
+        return True
+
+    snapshot = dsd_config.project_snapshot
+    if snapshot is not None and path in snapshot:
+        return snapshot.exists(path)
+    return path.exists()
+
+
+def _get_settings_blocks(start_lines=None):
+    """Get an index of the settings blocks in settings.py.
+
+    The index is reused as long as the settings text hasn't changed, and was built
+    with the same start lines.
+
+    Returns:
+        SettingsBlocks
+    """
+    global _settings_index
+    settings_text = _read_file(dsd_config.settings_path)
+    start_lines = start_lines or {}
+
+    if _settings_index is not None:
+        index, index_start_lines = _settings_index
+        if index.text == settings_text and index_start_lines == start_lines:
+            return index
+
+    index = SettingsBlocks(settings_text, start_lines)
+    _settings_index = (index, start_lines)
+    return index
+
+
+def _write_settings_block(settings_string, block, template_path):
+    """Write a settings block from a template to the end of settings.py.
+
+    If this template already wrote a block in this run and it's still in place,
+    replace it. Otherwise, append the new block.
+    """
+    path = dsd_config.settings_path
+    start, end = len(settings_string), len(settings_string)
+    if recorded := _settings_blocks.get((path, template_path)):
+        recorded_start, recorded_block = recorded
+        recorded_end = recorded_start + len(recorded_block)
+        if settings_string[recorded_start:recorded_end] == recorded_block:
+            start, end = recorded_start, recorded_end
+
+    modify_file(path, settings_string[:start] + block + settings_string[end:])
+
+    # Blocks from other templates that follow this one have moved.
+    shift = len(block) - (end - start)
+    for key, (other_start, other_block) in _settings_blocks.items():
+        if key[0] == path and other_start >= end and other_start > start:
+            _settings_blocks[key] = (other_start + shift, other_block)
+    _settings_blocks[(path, template_path)] = (start, block)
+
+
+def _is_unchanged(path, contents):
+    """Check whether an existing project file already has the given contents."""
+    try:
+        return _read_file(path) == contents
+    except (OSError, UnicodeDecodeError):
+        return False
+
+
+def _write_file(path, contents):
+    """Write a project file, and keep the project snapshot up to date.
+
+    If a change set is active, the write is staged rather than made on disk.
+    """
+    if dsd_config.change_set is not None:
+        dsd_config.change_set.write_file(path, contents)
+    else:
+        path.write_text(contents)
+
+    snapshot = dsd_config.project_snapshot
+    if snapshot is not None and path in snapshot:
+        dsd_config.project_snapshot = snapshot.with_file(path, contents)
+
+
+def _plan_command(cmd, skip_logging=False):
+    """Record a command that would be run, instead of running it."""
+    if skip_logging:
+        # The command includes sensitive information, such as a secret key.
+        cmd = f"{shlex.split(cmd)[0]} *arguments hidden*"
+    dsd_config.planned_commands.append(cmd)
+
+
+def _is_read_only(cmd, read_only=None):
+    """Decide whether a command only reads information, so it can run in plan mode.
+
+    If the caller didn't say, look at the command's subcommands. Commands such as
+    `fly secrets list` or `heroku apps:info` are read-only; a command that mentions
+    any subcommand that changes something isn't.
+
+    Returns:
+        bool
+    """
+    if read_only is not None:
+        return read_only
+
+    words = set()
+    for part in shlex.split(cmd)[1:]:
+        if part.startswith("-") and part != "--version":
+            continue
+        words.update(part.split(":"))
+
+    return bool(words & _READ_ONLY_SUBCOMMANDS) and not words & _WRITE_SUBCOMMANDS
+
+
+def _stream_command(cmd, skip_logging, timeout, stall_timeout, on_stall):
+    """Run a slow command once, streaming its output.
+
+    Returns:
+        tuple: The command's return code; why it was killed: "timeout", "stall", or
+        None if it wasn't killed; and the last lines it wrote to stderr.
+    """
+    cmd_name = cmd.split()[0]
+    start = time.monotonic()
+    killed_for = None
+    stderr_lines = deque(maxlen=_STDERR_LINES_KEPT)
+
+    def on_line(line):
+        if line.stream == "stderr":
+            stderr_lines.append(line.text)
+        write_output(line.text, skip_logging=skip_logging)
+
+    # Set once the command is killed, so the pump doesn't wait for children that
+    # inherited its pipes.
+    stop = threading.Event()
+    own_group = timeout is not None or stall_timeout is not None
+
+    def kill(reason):
+        nonlocal killed_for
+        if killed_for is None:
+            killed_for = reason
+            _kill_command(p, own_group)
+            stop.set()
+
+    def on_idle(idle_time):
+        if killed_for is not None:
+            return
+        elapsed = time.monotonic() - start
+        write_output(
+            f"\n  Still running {cmd_name} ({elapsed:.0f}s elapsed,"
+            f" no output for {idle_time:.0f}s)..."
+        )
+        if on_stall != "wait":
+            write_output(f"\n  {cmd_name} appears to have stalled; stopping it.")
+            kill("stall")
+
+    def on_timeout():
+        if p.poll() is None:
+            kill("timeout")
+
+    with subprocess.Popen(
+        cmd.split(),
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=False,
+        shell=dsd_config.use_shell,
+        **_process_group_args(own_group),
+    ) as p:
+        timer = None
+        if timeout is not None:
+            timer = threading.Timer(timeout, on_timeout)
+            timer.daemon = True
+            timer.start()
+        try:
+            output_pump.pump_output(
+                {"stdout": p.stdout, "stderr": p.stderr},
+                on_line,
+                idle_timeout=stall_timeout,
+                on_idle=on_idle if stall_timeout is not None else None,
+                stop=stop,
+            )
+            p.wait()
+        except BaseException:
+            # If the command is in its own process group, it won't see Ctrl-C.
+            _kill_command(p, own_group)
+            raise
+        finally:
+            if timer is not None:
+                timer.cancel()
+
+    if killed_for == "timeout":
+        write_output(f"\n  {cmd_name} didn't finish within {timeout}s; stopped it.")
+    return p.returncode, killed_for, "".join(stderr_lines)
+
+
+def _run_quick_command_once(cmd, check, timeout):
+    """Run a quick command once, capturing its output.
+
+    If there's a timeout, the command runs in its own process group. If it times out,
+    the whole group is killed, so a child process holding the pipes open can't keep
+    this waiting.
+
+    Returns:
+        CompletedProcess
+
+    Raises:
+        CalledProcessError: If check is True and the command fails. As before, this
+        isn't raised on Windows, where the command runs through the shell.
+        TimeoutExpired: If the command doesn't finish within `timeout` seconds.
+    """
+    if dsd_config.on_windows:
+        args, use_shell, check = cmd, True, False
+    else:
+        args, use_shell = shlex.split(cmd), False
+    own_group = timeout is not None
+
+    with subprocess.Popen(
+        args,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        shell=use_shell,
+        **_process_group_args(own_group),
+    ) as p:
+        try:
+            stdout, stderr = p.communicate(timeout=timeout)
+        except BaseException:
+            _kill_command(p, own_group)
+            p.wait()
+            raise
+
+    if check and p.returncode:
+        raise subprocess.CalledProcessError(p.returncode, args, stdout, stderr)
+    return subprocess.CompletedProcess(args, p.returncode, stdout, stderr)
+
+
+def _process_group_args(own_group):
+    """Get Popen arguments that start a command in its own process group, if needed.
+
+    Killing the group then stops the command along with any children it started.
+    A new session loses the controlling terminal, so prompts such as an ssh
+    passphrase during `git push` stop working. Commands are only given their own group
+    if they may need to be killed.
+    """
+    if not own_group:
+        return {}
+    if os.name == "nt":
+        return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def _kill_command(p, own_group):
+    """Kill a command, and all its children if it's in its own process group."""
+    if not own_group:
+        p.kill()
+        return
+
+    if os.name == "nt":
+        subprocess.run(
+            ["taskkill", "/F", "/T", "/PID", str(p.pid)], capture_output=True
+        )
+        return
+
+    try:
+        os.killpg(p.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        # The command and its children have already exited.
+        pass
+
+
+def _retry_command(cmd, returncode, stderr, retry, attempt):
+    """Decide whether a failed command should run again, and wait before it does.
+
+    Each failed attempt is reported, without the command's arguments, which may be
+    sensitive.
+
+    Returns:
+        bool: True if the command should be run again.
+    """
+    if retry is None or returncode == 0:
+        return False
+
+    if isinstance(stderr, bytes):
+        stderr = stderr.decode("utf-8", errors="replace")
+
+    cmd_name = cmd.split()[0]
+    msg = f"\n  {cmd_name} failed with exit code {returncode}"
+    msg += f" (attempt {attempt} of {retry.max_attempts})."
+    if not retry.should_retry(returncode, stderr, attempt):
+        write_output(msg)
+        return False
+
+    delay = retry.get_delay(attempt)
+    write_output(f"{msg} Retrying in {delay:.1f}s...")
+    time.sleep(delay)
+    return True
+
+
+def _reload_project_snapshot():
+    """Read files in the project snapshot again, after a command may have changed them.
+
+    For example, `poetry export` can write requirements.txt.
+    """
+    snapshot = dsd_config.project_snapshot
+    if snapshot is not None:
+        dsd_config.project_snapshot = snapshot.reload()
+
+
 def log_output_string(output):
     """Log output as a series of single lines, for better log parsing.
 
@@ -510,31 +1326,71 @@ def _strip_secret_key(line):
 
 def add_pipenv_pkg(pipfile_path, package, version):
     """Add a package to Pipfile."""
+    _add_pipenv_pkgs(pipfile_path, [(package, version)])
+
+
+def _add_pipenv_pkgs(pipfile_path, packages):
+    """Add a list of (package, version) tuples to Pipfile, in a single write."""
     # A caller may pass an empty version string, which would override a
     # default argument value of "*".
-    if not version:
-        version = "*"
+    new_packages = {package: version or "*" for package, version in packages}
 
-    data = toml.load(pipfile_path)
-    data["packages"][package] = version
-    data_str = toml.dumps(data)
-    pipfile_path.write_text(data_str)
+    try:
+        contents = _read_file(pipfile_path)
+        data_str = toml_editor.set_values(contents, ("packages",), new_packages)
+    except toml_editor.UnsupportedTomlEdit:
+        data = _load_toml(pipfile_path)
+        data["packages"].update(new_packages)
+        data_str = toml.dumps(data)
+
+    _write_file(pipfile_path, data_str)
 
 
 def _check_poetry_deploy_group():
-    """Make sure a deploy group exists in pyproject.toml."""
-    pptoml_data = toml.load(dsd_config.pyprojecttoml_path)
-    try:
-        deploy_group = pptoml_data["tool"]["poetry"]["group"]["deploy"]
-    except KeyError:
-        create_poetry_deploy_group(dsd_config.pyprojecttoml_path)
+    """Make sure a deploy group will exist in pyproject.toml.
+
+    The group is created when pending requirements are written. Only report it for
+    the first package in a batch; later packages go in the same group.
+    """
+    if _pending_requirements:
+        return
+
+    pptoml_data = _load_toml(dsd_config.pyprojecttoml_path)
+    if not _has_poetry_deploy_group(pptoml_data):
         msg = "    Added optional deploy group to pyproject.toml."
         write_output(msg)
 
 
 def create_poetry_deploy_group(pptoml_path):
     """Create a deploy group for Poetry in pyproject.toml."""
-    pptoml_data = toml.load(pptoml_path)
+    pptoml_data_str = _add_poetry_deploy_group(pptoml_path, {})
+    _write_file(pptoml_path, pptoml_data_str)
+
+
+def _has_poetry_deploy_group(pptoml_data):
+    """Check if parsed pyproject.toml data has a deploy group."""
+    return "deploy" in pptoml_data["tool"]["poetry"].get("group", {})
+
+
+def _add_poetry_deploy_group(pptoml_path, dependencies):
+    """Get the contents of pyproject.toml, with a new optional deploy group.
+
+    The new group is added at the end of the file. If that can't be done without
+    rewriting the file, fall back to a round-trip through toml.
+
+    Returns:
+        str
+    """
+    pptoml_data = _load_toml(pptoml_path)
+    deploy_tables = [
+        (_DEPLOY_GROUP_TABLE, {"optional": True}),
+        (_DEPLOY_GROUP_TABLE + ("dependencies",), dependencies),
+    ]
+    try:
+        contents = _read_file(pptoml_path)
+        return toml_editor.add_tables(contents, deploy_tables, pptoml_data)
+    except toml_editor.UnsupportedTomlEdit:
+        pass
 
     # Create Poetry group if needed.
     if "group" not in pptoml_data["tool"]["poetry"]:
@@ -542,32 +1398,68 @@ def create_poetry_deploy_group(pptoml_path):
 
     # Create optional deploy group, and deploy group dependencies.
     pptoml_data["tool"]["poetry"]["group"]["deploy"] = {"optional": True}
-    pptoml_data["tool"]["poetry"]["group"]["deploy"]["dependencies"] = {}
+    pptoml_data["tool"]["poetry"]["group"]["deploy"]["dependencies"] = dependencies
 
-    pptoml_data_str = toml.dumps(pptoml_data)
-    pptoml_path.write_text(pptoml_data_str)
+    return toml.dumps(pptoml_data)
 
 
 def add_poetry_pkg(pptoml_path, package, version):
     """Add a package to poetry deploy group of pyproject.toml."""
+    _add_poetry_pkgs(pptoml_path, [(package, version)])
+
+
+def _add_poetry_pkgs(pptoml_path, packages):
+    """Add a list of (package, version) tuples to the poetry deploy group.
 
+    The deploy group is created if it doesn't exist yet, in the same write.
+    """
     # A method in simple_deploy may pass an empty string, which would override a
     # default argument value of "*".
-    if not version:
-        version = "*"
+    new_packages = {package: version or "*" for package, version in packages}
 
-    pptoml_data = toml.load(pptoml_path)
-    pptoml_data["tool"]["poetry"]["group"]["deploy"]["dependencies"][package] = version
+    pptoml_data = _load_toml(pptoml_path)
+    if not _has_poetry_deploy_group(pptoml_data):
+        pptoml_data_str = _add_poetry_deploy_group(pptoml_path, new_packages)
+        _write_file(pptoml_path, pptoml_data_str)
+        return
 
-    pptoml_data_str = toml.dumps(pptoml_data)
-    pptoml_path.write_text(pptoml_data_str)
+    deps_table = _DEPLOY_GROUP_TABLE + ("dependencies",)
+    try:
+        contents = _read_file(pptoml_path)
+        pptoml_data_str = toml_editor.set_values(contents, deps_table, new_packages)
+    except toml_editor.UnsupportedTomlEdit:
+        pptoml_data["tool"]["poetry"]["group"]["deploy"]["dependencies"].update(
+            new_packages
+        )
+        pptoml_data_str = toml.dumps(pptoml_data)
+
+    _write_file(pptoml_path, pptoml_data_str)
 
 
 def add_req_txt_pkg(req_txt_path, package, version):
     """Add a package to requirements.txt."""
-    contents = req_txt_path.read_text()
-    pkg_string = f"\n{package + version}"
-    req_txt_path.write_text(contents + pkg_string)
+    _add_req_txt_pkgs(req_txt_path, [(package, version)])
+
+
+def _add_req_txt_pkgs(req_txt_path, packages):
+    """Add a list of (package, version) tuples to requirements.txt, in one write."""
+    contents = _read_file(req_txt_path)
+    pkg_strings = "".join(f"\n{package + version}" for package, version in packages)
+    _write_file(req_txt_path, contents + pkg_strings)
+
+
+def _write_requirements(packages):
+    """Write pending (package, version) tuples to the project's dependency file."""
+    if not packages:
+        return
+
+    if dsd_config.pkg_manager == "pipenv":
+        _add_pipenv_pkgs(dsd_config.pipfile_path, packages)
+    elif dsd_config.pkg_manager == "poetry":
+        _add_poetry_pkgs(dsd_config.pyprojecttoml_path, packages)
+    else:
+        _add_req_txt_pkgs(dsd_config.req_txt_path, packages)
+
 
 def logs_to_console(logger=None):
     """Check if logging is configured to stream to stdout or stderr."""
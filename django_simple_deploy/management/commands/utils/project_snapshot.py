@@ -0,0 +1,111 @@
+"""Snapshot of the user's project, taken once during inspection.
+
+Inspecting a project used to read the same files over and over; pyproject.toml could
+be parsed five or more times in a single run. A `ProjectSnapshot` is built once in
+`Command._inspect_project()`, and holds the contents of every file that inspection and
+the `plugin_utils` helpers need, along with the output of the git status checks.
+Those helpers consult the snapshot instead of going back to disk.
+
+File contents in a snapshot aren't changed in place. When a helper writes to a file in
+the snapshot, it replaces `dsd_config.project_snapshot` with an updated copy. See
+`with_file()`. Parsed TOML is cached the first time it's needed, and `load_toml()`
+returns a copy, so callers can't change what the snapshot holds.
+"""
+
+import copy
+from dataclasses import dataclass, field, replace
+from pathlib import Path
+from types import MappingProxyType
+
+import toml
+
+from .git_status import GitStatus
+
+
+@dataclass(frozen=True, repr=False)
+class ProjectSnapshot:
+    """Contents of the project files core cares about, read exactly once."""
+
+    # Text of each file in the snapshot. None if the file doesn't exist.
+    files: MappingProxyType
+
+    # Result of checking `git status`, and output of `git diff`, if git status was
+    # checked.
+    git_status: GitStatus = None
+    git_diff: str = ""
+
+    # TOML files are parsed the first time they're needed; Pipfile and pyproject.toml
+    # aren't always both used. Each snapshot has its own cache.
+    _parsed_toml: dict = field(default_factory=dict, compare=False)
+
+    @classmethod
+    def build(cls, paths, git_status=None, git_diff=""):
+        """Read each file in paths, and build a snapshot."""
+        files = {Path(path): _read_text(path) for path in paths}
+        return cls(MappingProxyType(files), git_status, git_diff)
+
+    def __contains__(self, path):
+        return Path(path) in self.files
+
+    def __repr__(self):
+        # Don't dump file contents into logs.
+        paths = ", ".join(path.as_posix() for path in self.files)
+        return f"ProjectSnapshot(files=[{paths}])"
+
+    def exists(self, path):
+        """Check whether a file in the snapshot exists."""
+        return self.files[Path(path)] is not None
+
+    def read_text(self, path):
+        """Get the contents of a file in the snapshot."""
+        contents = self.files[Path(path)]
+        if contents is None:
+            raise FileNotFoundError(f"File {Path(path).as_posix()} does not exist.")
+        return contents
+
+    def load_toml(self, path):
+        """Get the parsed contents of a TOML file in the snapshot.
+
+        Returns a copy, so callers can modify the data before writing it back.
+        """
+        path = Path(path)
+        if path not in self._parsed_toml:
+            self._parsed_toml[path] = toml.loads(self.read_text(path))
+        return copy.deepcopy(self._parsed_toml[path])
+
+    def with_git_output(self, git_status, git_diff):
+        """Get a new snapshot, including output of the git status checks."""
+        return replace(
+            self,
+            git_status=git_status,
+            git_diff=git_diff,
+            _parsed_toml=dict(self._parsed_toml),
+        )
+
+    def reload(self):
+        """Get a new snapshot, reading the same files from disk again.
+
+        Git output isn't refreshed; it describes the project as it was during
+        inspection.
+        """
+        return self.build(self.files, self.git_status, self.git_diff)
+
+    def with_file(self, path, contents):
+        """Get a new snapshot, reflecting new contents for one file."""
+        path = Path(path)
+        files = dict(self.files)
+        files[path] = contents
+
+        parsed_toml = {p: data for p, data in self._parsed_toml.items() if p != path}
+        return replace(self, files=MappingProxyType(files), _parsed_toml=parsed_toml)
+
+
+# --- Helper functions ---
+
+
+def _read_text(path):
+    """Read a file's contents, or return None if it doesn't exist."""
+    try:
+        return Path(path).read_text()
+    except (FileNotFoundError, IsADirectoryError):
+        return None
@@ -0,0 +1,178 @@
+"""Parse requirements files, following the files they include.
+
+Projects often split requirements across several files:
+    # requirements.txt
+    -r requirements/base.txt
+    -c requirements/constraints.txt
+    gunicorn==23.0.0 \
+        --hash=sha256:...
+
+`parse_req_txt_files()` follows -r/--requirement and -c/--constraint references, and
+reads each file once, line by line. Parsed files are cached by path, mtime, and size, so
+re-parsing after dsd modifies the top-level file doesn't re-read every included file.
+
+Each requirement records the file it was found in. Packages listed only in constraint
+files aren't installed, so they're reported separately.
+"""
+
+import re
+from pathlib import Path
+from typing import NamedTuple
+
+from .requirements_index import Requirement
+
+
+# A comment starts at the beginning of a line, or after whitespace.
+_COMMENT_RE = re.compile(r"(^|\s+)#.*$")
+
+_INCLUDE_OPTIONS = ("-r", "--requirement")
+_CONSTRAINT_OPTIONS = ("-c", "--constraint")
+_EDITABLE_OPTIONS = ("-e", "--editable")
+
+# Parsed files, keyed by path. Values are ((mtime_ns, size), parsed items).
+_parsed_files = {}
+
+
+class ReqTxtFiles(NamedTuple):
+    """Everything found in a requirements file, and the files it references."""
+
+    requirements: list
+    constraints: list
+    # Every file that was read, in the order it was first referenced.
+    paths: list
+
+
+def parse_req_txt_files(path, contents=None):
+    """Parse a requirements file, and every file it includes.
+
+    If the top-level file has already been read, pass its contents to avoid reading it
+    again. Missing included files, and includes that are URLs, are skipped.
+
+    Returns:
+        ReqTxtFiles
+    """
+    result = ReqTxtFiles([], [], [])
+    _parse_graph(Path(path), contents, False, result, set())
+    return result
+
+
+# --- Helper functions ---
+
+
+def _parse_graph(path, contents, is_constraint, result, visited):
+    """Add everything from one file to result, expanding includes where they appear."""
+    resolved_path = path.resolve()
+    if resolved_path in visited:
+        return
+    visited.add(resolved_path)
+
+    if contents is not None:
+        items = _parse_lines(contents.splitlines(), path)
+    else:
+        items = _parse_file(path)
+        if items is None:
+            return
+    result.paths.append(path)
+
+    for kind, value in items:
+        if kind == "requirement":
+            if is_constraint:
+                result.constraints.append(value)
+            else:
+                result.requirements.append(value)
+        else:
+            # Everything a constraints file includes is a constraint as well.
+            nested_constraint = is_constraint or kind == "constraint"
+            _parse_graph(value, None, nested_constraint, result, visited)
+
+
+def _parse_file(path):
+    """Parse a single file, using the cache if it hasn't changed.
+
+    Returns:
+        list | None: Parsed items, or None if the file doesn't exist.
+    """
+    try:
+        stat = path.stat()
+    except OSError:
+        return None
+
+    stat_key = (stat.st_mtime_ns, stat.st_size)
+    cached = _parsed_files.get(path)
+    if cached and cached[0] == stat_key:
+        return cached[1]
+
+    with open(path) as f:
+        items = _parse_lines(f, path)
+    _parsed_files[path] = (stat_key, items)
+    return items
+
+
+def _parse_lines(lines, path):
+    """Parse lines from a requirements file.
+
+    Returns:
+        list: Tuples of ("requirement", Requirement), ("include", Path), or
+        ("constraint", Path), in the order they appear.
+    """
+    items = []
+    source = path.as_posix()
+    for line in _join_lines(lines):
+        if line.startswith("-"):
+            option, value = _split_option(line)
+            if option in _INCLUDE_OPTIONS + _CONSTRAINT_OPTIONS:
+                if "://" in value:
+                    continue
+                kind = "include" if option in _INCLUDE_OPTIONS else "constraint"
+                items.append((kind, path.parent / value))
+            elif option in _EDITABLE_OPTIONS:
+                if requirement := Requirement.parse(value):
+                    items.append(("requirement", requirement._replace(source=source)))
+            # Other options, such as --index-url, don't affect which packages are listed.
+            continue
+
+        # Per-requirement options such as --hash follow the requirement.
+        requirement_str = re.split(r"\s+-", line, maxsplit=1)[0]
+        if requirement := Requirement.parse(requirement_str):
+            items.append(("requirement", requirement._replace(source=source)))
+
+    return items
+
+
+def _join_lines(lines):
+    """Join continuation lines, and remove comments and blank lines.
+
+    Yields:
+        str: Logical lines.
+    """
+    buffer = ""
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if line.endswith("\\"):
+            buffer += line[:-1]
+            continue
+
+        line = _COMMENT_RE.sub("", buffer + line).strip()
+        buffer = ""
+        if line:
+            yield line
+
+    # A continuation on the last line.
+    if line := _COMMENT_RE.sub("", buffer).strip():
+        yield line
+
+
+def _split_option(line):
+    """Split a line such as "-r base.txt" or "--requirement=base.txt".
+
+    Returns:
+        Tuple[str, str]: (option, value)
+    """
+    if line.startswith("--"):
+        first_word = line.split()[0]
+        separator = "=" if "=" in first_word else " "
+        option, _, value = line.partition(separator)
+    else:
+        # Short options may be attached to their value, as in "-rbase.txt".
+        option, value = line[:2], line[2:]
+    return option, value.strip().lstrip("=").strip()
@@ -0,0 +1,173 @@
+"""Index of the project's current requirements.
+
+Requirements are found once during inspection, and stored in a `RequirementsIndex` at
+`dsd_config.requirements`. Names are normalized as described in PEP 503, so checking
+for a package doesn't depend on case, or on the use of "-", "_", or ".":
+    >>> "Django_Simple.Deploy" in RequirementsIndex(["django-simple-deploy"])
+    True
+
+The index is updated as `plugin_utils.add_package()` adds packages, so a package is
+never added twice in one run.
+
+Requirements files are parsed in `req_txt_parser`, which follows included files.
+"""
+
+import re
+from typing import NamedTuple
+
+
+# Name, optional extras, and everything after that.
+_REQUIREMENT_RE = re.compile(
+    r"^\s*([A-Za-z0-9](?:[A-Za-z0-9._-]*[A-Za-z0-9])?)\s*(?:\[([^\]]*)\])?\s*(.*)$"
+)
+_EGG_RE = re.compile(r"#egg=([A-Za-z0-9._-]+)")
+
+
+def canonicalize_name(name):
+    """Normalize a package name, as described in PEP 503."""
+    return re.sub(r"[-_.]+", "-", name).lower()
+
+
+class Requirement(NamedTuple):
+    """A single requirement, as specified in the project."""
+
+    # Name as written in the project's requirements.
+    name: str
+    extras: tuple = ()
+    # Version specifier, such as ">=4.2", or "^4.2" for Poetry. For a direct
+    # reference, this is the URL, as in "@ https://...". Environment markers aren't
+    # included.
+    specifier: str = ""
+    # Path to the file the requirement was found in, if known.
+    source: str = ""
+
+    @classmethod
+    def parse(cls, requirement):
+        """Parse a requirement string such as "Django[argon2]>=4.2".
+
+        Direct references such as "django-foo @ https://..." are named before the
+        "@". Bare URLs and paths only name a package if they include #egg=.
+
+        Returns:
+            Requirement | None: None if the string doesn't name a package.
+        """
+        requirement = requirement.split(";")[0].strip()
+
+        m = _REQUIREMENT_RE.match(requirement)
+        is_direct_reference = m and m.group(3).startswith("@")
+        if not is_direct_reference and (
+            "://" in requirement or requirement.startswith((".", "/"))
+        ):
+            if m := _EGG_RE.search(requirement):
+                return cls(m.group(1))
+            return None
+
+        if not m:
+            return None
+
+        name, extras, specifier = m.groups()
+        extras = tuple(e.strip() for e in (extras or "").split(",") if e.strip())
+        return cls(name, extras, specifier.strip())
+
+    @property
+    def canonical_name(self):
+        return canonicalize_name(self.name)
+
+    def __str__(self):
+        extras = f"[{','.join(self.extras)}]" if self.extras else ""
+        separator = " " if self.specifier.startswith("@") else ""
+        return f"{self.name}{extras}{separator}{self.specifier}"
+
+
+class RequirementsIndex:
+    """Requirements keyed by canonical name, with O(1) membership checks.
+
+    Iterating over the index yields names as they're written in the project, in the
+    order they were found.
+    """
+
+    def __init__(self, requirements=()):
+        self._requirements = {}
+        for requirement in requirements:
+            self.add(requirement)
+
+    @classmethod
+    def from_pipfile(cls, parsed_toml):
+        """Build an index from a parsed Pipfile."""
+        return cls(_from_toml_table(parsed_toml.get("packages", {})))
+
+    @classmethod
+    def from_pyproject_toml(cls, parsed_toml):
+        """Build an index from a parsed pyproject.toml file that uses Poetry.
+
+        Main requirements and deploy group requirements are included.
+        """
+        poetry = parsed_toml["tool"]["poetry"]
+        main_reqs = dict(poetry["dependencies"])
+        deploy_reqs = poetry.get("group", {}).get("deploy", {}).get("dependencies", {})
+
+        # Remove python as a requirement, as we're only interested in packages.
+        main_reqs.pop("python", None)
+        return cls(_from_toml_table(main_reqs) + _from_toml_table(deploy_reqs))
+
+    def add(self, requirement):
+        """Add a requirement, either a string or a Requirement.
+
+        If the package is already in the index, the existing entry is kept.
+        """
+        if isinstance(requirement, str):
+            requirement = Requirement.parse(requirement)
+            if requirement is None:
+                return
+        self._requirements.setdefault(requirement.canonical_name, requirement)
+
+    def get(self, name):
+        """Get the Requirement for a package, or None if it's not in the index."""
+        return self._requirements.get(_canonical_key(name))
+
+    def __contains__(self, name):
+        return _canonical_key(name) in self._requirements
+
+    def __iter__(self):
+        return (requirement.name for requirement in self._requirements.values())
+
+    def __len__(self):
+        return len(self._requirements)
+
+    def __repr__(self):
+        requirements = ", ".join(str(r) for r in self._requirements.values())
+        return f"RequirementsIndex([{requirements}])"
+
+    def requirements(self):
+        """Get all Requirements in the index."""
+        return list(self._requirements.values())
+
+
+# --- Helper functions ---
+
+
+def _canonical_key(name):
+    """Get the index key for a name, which may include extras or a specifier."""
+    requirement = Requirement.parse(name)
+    return requirement.canonical_name if requirement else canonicalize_name(name)
+
+
+def _from_toml_table(table):
+    """Get Requirements from a Pipfile or Poetry dependencies table.
+
+    Values are either a version string, or a table that may include a version and
+    extras.
+    """
+    requirements = []
+    for name, value in table.items():
+        if isinstance(value, dict):
+            extras = tuple(value.get("extras", ()))
+            version = value.get("version", "")
+        elif isinstance(value, str):
+            extras, version = (), value
+        else:
+            # Poetry allows a list of constraints; keep the name.
+            extras, version = (), ""
+        specifier = "" if version == "*" else version
+        requirements.append(Requirement(name, extras, specifier))
+    return requirements
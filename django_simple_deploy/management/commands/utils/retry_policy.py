@@ -0,0 +1,74 @@
+"""Retry commands that fail for reasons that are likely to be temporary.
+
+Platform CLIs sometimes fail because of rate limits, or a brief outage in the
+platform's control plane. A plugin can describe which failures are worth retrying, and
+pass that policy to `run_quick_command()` or `run_slow_command()`:
+
+    policy = plugin_utils.RetryPolicy(
+        max_attempts=4,
+        stderr_patterns=(r"rate limit", r"502 Bad Gateway"),
+    )
+    plugin_utils.run_quick_command("fly apps create", check=True, retry=policy)
+
+Delays between attempts grow exponentially, with full jitter: each delay is a random
+value between 0 and the exponential delay, so several runs that fail at the same time
+don't all retry at the same time.
+"""
+
+import random
+import re
+from dataclasses import dataclass
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Which command failures to retry, and how."""
+
+    # Total number of times to run the command, including the first run.
+    max_attempts: int = 3
+
+    # Exit codes worth retrying. A failure is retried if it matches an exit code or
+    # a pattern. If there are no exit codes and no patterns, every failure is retried.
+    exit_codes: tuple = ()
+
+    # Regular expressions, searched for in the command's stderr.
+    stderr_patterns: tuple = ()
+
+    # Delay before the first retry may be up to base_delay seconds, and the limit
+    # doubles for each retry after that, up to max_delay seconds.
+    base_delay: float = 1.0
+    max_delay: float = 30.0
+
+    def __post_init__(self):
+        if self.max_attempts < 1:
+            raise ValueError("max_attempts must be at least 1.")
+        object.__setattr__(self, "exit_codes", tuple(self.exit_codes))
+        object.__setattr__(self, "stderr_patterns", tuple(self.stderr_patterns))
+
+    def should_retry(self, returncode, stderr, attempt):
+        """Decide whether to run a command again, after a failed attempt.
+
+        Args:
+            returncode: Exit code of the attempt.
+            stderr: Output the attempt wrote to stderr, as a string.
+            attempt: Number of the attempt that failed, starting at 1.
+
+        Returns:
+            bool
+        """
+        if returncode == 0 or attempt >= self.max_attempts:
+            return False
+        if not self.exit_codes and not self.stderr_patterns:
+            return True
+        if returncode in self.exit_codes:
+            return True
+        return any(re.search(pattern, stderr or "") for pattern in self.stderr_patterns)
+
+    def get_delay(self, attempt):
+        """Get the number of seconds to wait after a failed attempt.
+
+        Returns:
+            float
+        """
+        limit = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, limit)
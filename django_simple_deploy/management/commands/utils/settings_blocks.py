@@ -0,0 +1,173 @@
+"""Find, replace, and remove the settings blocks that dsd manages in settings.py.
+
+Blocks written through `plugin_utils.replace_settings_block()` are wrapped in marker
+lines:
+    # django-simple-deploy: begin Fly.io settings
+    ...
+    # django-simple-deploy: end Fly.io settings
+
+Older blocks, written by appending a rendered template to settings.py, only have a
+start line such as "# Fly.io settings.". Those blocks run to the start of the next
+block, or to the end of the file.
+
+`SettingsBlocks` scans the settings text once, and indexes every block it finds. After
+that, looking up a block is a dict lookup, and replacing or removing one is a single
+splice. Start lines are found with `str.find()`, so they're matched literally.
+"""
+
+from typing import NamedTuple
+
+
+BEGIN_MARKER = "# django-simple-deploy: begin {name} settings"
+END_MARKER = "# django-simple-deploy: end {name} settings"
+
+_BEGIN_PREFIX, _BEGIN_SUFFIX = BEGIN_MARKER.split("{name}")
+_END_PREFIX, _END_SUFFIX = END_MARKER.split("{name}")
+
+
+class SettingsBlock(NamedTuple):
+    """Location of a block in the settings text."""
+
+    name: str
+    start: int
+    # Offset just past the block, including its end marker line if it has one.
+    end: int
+    has_markers: bool
+
+
+class SettingsBlocks:
+    """Index of dsd-managed blocks in the text of a settings file."""
+
+    def __init__(self, text, start_lines=None):
+        """Scan text for blocks.
+
+        Args:
+            text: Contents of settings.py.
+            start_lines: Optional dict of block names to the first line of older blocks
+                that don't have markers, ie {"Fly.io": "# Fly.io settings."}.
+        """
+        self.text = text
+        self._blocks = {}
+
+        for block in _find_marked_blocks(text):
+            self._blocks.setdefault(block.name, block)
+
+        for name, start_line in (start_lines or {}).items():
+            if name in self._blocks:
+                continue
+            start = text.find(start_line)
+            if start != -1 and not self._is_in_block(start):
+                self._blocks[name] = SettingsBlock(name, start, len(text), False)
+
+        self._end_unmarked_blocks()
+
+    def __contains__(self, name):
+        return name in self._blocks
+
+    def __iter__(self):
+        return iter(self.names())
+
+    def get(self, name):
+        """Get the location of a block, or None if it's not in the settings."""
+        return self._blocks.get(name)
+
+    def get_text(self, name):
+        """Get the text of a block, or None if it's not in the settings."""
+        block = self._blocks.get(name)
+        if block is None:
+            return None
+        return self.text[block.start : block.end]
+
+    def names(self):
+        """Get the names of all blocks, in the order they appear."""
+        return [block.name for block in self._sorted_blocks()]
+
+    def replace(self, name, contents):
+        """Replace a block, or add it at the end of the file if it's not present.
+
+        The new block is wrapped in markers.
+
+        Returns:
+            str: The new settings text.
+        """
+        if contents and not contents.endswith("\n"):
+            contents += "\n"
+        begin = BEGIN_MARKER.format(name=name)
+        end = END_MARKER.format(name=name)
+        new_block = f"{begin}\n{contents}{end}\n"
+
+        block = self._blocks.get(name)
+        if block is None:
+            start = end_offset = len(self.text)
+            if self.text and not self.text.endswith("\n"):
+                new_block = "\n" + new_block
+        else:
+            start, end_offset = block.start, block.end
+
+        self._splice(start, end_offset, new_block)
+        self._blocks[name] = SettingsBlock(name, start, start + len(new_block), True)
+        return self.text
+
+    def remove(self, name):
+        """Remove a block, if it's present.
+
+        Returns:
+            str: The new settings text.
+        """
+        block = self._blocks.pop(name, None)
+        if block is not None:
+            self._splice(block.start, block.end, "")
+        return self.text
+
+    def _sorted_blocks(self):
+        return sorted(self._blocks.values(), key=lambda block: block.start)
+
+    def _is_in_block(self, offset):
+        return any(b.start <= offset < b.end for b in self._blocks.values())
+
+    def _end_unmarked_blocks(self):
+        """Blocks without markers end where the next block starts."""
+        blocks = self._sorted_blocks()
+        for block, next_block in zip(blocks, blocks[1:]):
+            if not block.has_markers:
+                self._blocks[block.name] = block._replace(end=next_block.start)
+
+    def _splice(self, start, end, new_text):
+        """Replace text between start and end, and shift the blocks that follow.
+
+        Blocks that end where the spliced text starts don't need to change.
+        """
+        self.text = self.text[:start] + new_text + self.text[end:]
+
+        shift = len(new_text) - (end - start)
+        for name, block in self._blocks.items():
+            if block.start >= end and block.start > start:
+                self._blocks[name] = block._replace(
+                    start=block.start + shift, end=block.end + shift
+                )
+
+
+# --- Helper functions ---
+
+
+def _find_marked_blocks(text):
+    """Find blocks wrapped in begin and end markers, in one pass over the text.
+
+    A begin marker without a matching end marker isn't treated as a block.
+
+    Yields:
+        SettingsBlock
+    """
+    open_blocks = {}
+    offset = 0
+    for line in text.splitlines(keepends=True):
+        stripped = line.strip()
+        if stripped.startswith(_BEGIN_PREFIX) and stripped.endswith(_BEGIN_SUFFIX):
+            name = stripped[len(_BEGIN_PREFIX) : -len(_BEGIN_SUFFIX)]
+            open_blocks.setdefault(name, offset)
+        elif stripped.startswith(_END_PREFIX) and stripped.endswith(_END_SUFFIX):
+            name = stripped[len(_END_PREFIX) : -len(_END_SUFFIX)]
+            if name in open_blocks:
+                start = open_blocks.pop(name)
+                yield SettingsBlock(name, start, offset + len(line), True)
+        offset += len(line)
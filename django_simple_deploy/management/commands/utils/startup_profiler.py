@@ -0,0 +1,190 @@
+"""Profile the import-time cost of `manage.py deploy`.
+
+The deploy command can't time imports that have already happened by the time it
+runs. Instead, a fresh interpreter is started with `-X importtime`, and it imports
+everything `deploy` needs: Django and the user's INSTALLED_APPS, django-simple-deploy,
+and the plugin. The raw output is parsed into a tree of imports, and summarized by
+where the time was spent.
+"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+
+# Only imports slower than this are shown in the tree of slowest imports.
+MIN_REPORTED_US = 1000
+
+# Order of categories in the report.
+CATEGORIES = ["Django", "django-simple-deploy", "Plugin", "Project", "Other"]
+
+# Script that's profiled. `-X importtime` only sees imports that go through the
+# import statement, but Django loads settings and INSTALLED_APPS, and core loads the
+# plugin, with importlib.import_module(). Route those calls through __import__(), so
+# they're timed as well.
+PROFILE_SCRIPT = """\
+import importlib, importlib.util, sys
+
+def _import_module(name, package=None):
+    if name.startswith("."):
+        name = importlib.util.resolve_name(name, package)
+    __import__(name)
+    return sys.modules[name]
+
+importlib.import_module = _import_module
+
+import django
+django.setup()
+import django_simple_deploy.management.commands.deploy
+import {plugin_name}.deploy
+"""
+
+
+class ImportNode:
+    """A single import, and the imports it triggered."""
+
+    def __init__(self, name, self_us, cumulative_us, children=None):
+        self.name = name
+        self.self_us = self_us
+        self.cumulative_us = cumulative_us
+        self.children = children or []
+
+    def walk(self):
+        """Yield this node, and every node below it."""
+        yield self
+        for child in self.children:
+            yield from child.walk()
+
+
+def run_importtime(plugin_name, project_root):
+    """Import everything deploy needs in a fresh interpreter, with -X importtime.
+
+    Returns:
+        str: Raw importtime output, from stderr.
+    """
+    script = PROFILE_SCRIPT.format(plugin_name=plugin_name)
+    cmd = [sys.executable, "-X", "importtime", "-c", script]
+
+    # DJANGO_SETTINGS_MODULE is already set by manage.py, and is inherited here.
+    output = subprocess.run(
+        cmd, capture_output=True, cwd=project_root, env=os.environ.copy()
+    )
+    return output.stderr.decode(errors="replace")
+
+
+def parse_importtime(output):
+    """Parse the output of `-X importtime` into a tree of imports.
+
+    Each import is reported after all the imports it triggered, indented two spaces
+    per level of nesting. So, when a line is read, every pending node one level
+    deeper is one of its children.
+
+    Returns:
+        List[ImportNode]: Top-level imports.
+    """
+    pending = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+
+        parts = line.removeprefix("import time:").split("|")
+        if len(parts) != 3:
+            continue
+        try:
+            self_us, cumulative_us = int(parts[0]), int(parts[1])
+        except ValueError:
+            # Header line.
+            continue
+
+        name = parts[2][1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        children = pending.pop(depth + 1, [])
+
+        node = ImportNode(name.strip(), self_us, cumulative_us, children)
+        pending.setdefault(depth, []).append(node)
+
+    return pending.get(0, [])
+
+
+def get_project_packages(project_root):
+    """Get the names of top-level modules and packages in the user's project."""
+    packages = set()
+    for path in Path(project_root).iterdir():
+        if path.suffix == ".py":
+            packages.add(path.stem)
+        elif (path / "__init__.py").exists():
+            packages.add(path.name)
+
+    return packages
+
+
+def categorize(module_name, plugin_name, project_packages):
+    """Decide which part of the stack a module belongs to."""
+    top_level = module_name.split(".")[0]
+    if top_level == "django":
+        return "Django"
+    if top_level == "django_simple_deploy":
+        return "django-simple-deploy"
+    if top_level == plugin_name:
+        return "Plugin"
+    if top_level in project_packages:
+        return "Project"
+    return "Other"
+
+
+def build_report(roots, plugin_name, project_packages):
+    """Build a report of import times, by category and as a sorted tree.
+
+    Category totals use each module's self time, so they add up to the total.
+
+    Returns:
+        Tuple[str, str]: Short summary, and the full report.
+    """
+    totals = dict.fromkeys(CATEGORIES, 0)
+    for root in roots:
+        for node in root.walk():
+            category = categorize(node.name, plugin_name, project_packages)
+            totals[category] += node.self_us
+
+    summary_lines = ["Import time by category:"]
+    for category in CATEGORIES:
+        label = f"Plugin ({plugin_name})" if category == "Plugin" else category
+        summary_lines.append(f"  {label:<32}{_ms(totals[category]):>10}")
+    summary_lines.append(f"  {'Total':<32}{_ms(sum(totals.values())):>10}")
+    summary = "\n".join(summary_lines)
+
+    report_lines = ["django-simple-deploy startup profile", "", summary, ""]
+    report_lines.append(
+        f"Slowest imports (cumulative, at least {_ms(MIN_REPORTED_US)}):"
+    )
+    for root in sorted(roots, key=lambda n: n.cumulative_us, reverse=True):
+        report_lines += _format_tree(root, plugin_name, project_packages, depth=1)
+
+    return summary, "\n".join(report_lines) + "\n"
+
+
+# --- Helper functions ---
+
+
+def _format_tree(node, plugin_name, project_packages, depth):
+    """Format a node and its slow children, slowest first."""
+    if node.cumulative_us < MIN_REPORTED_US:
+        return []
+
+    category = categorize(node.name, plugin_name, project_packages)
+    indent = "  " * depth
+    lines = [
+        f"{_ms(node.cumulative_us):>10}  {indent}{node.name} [{category}], self {_ms(node.self_us)}"
+    ]
+
+    children = sorted(node.children, key=lambda n: n.cumulative_us, reverse=True)
+    for child in children:
+        lines += _format_tree(child, plugin_name, project_packages, depth + 1)
+
+    return lines
+
+
+def _ms(us):
+    """Format a number of microseconds as milliseconds."""
+    return f"{us / 1000:.1f} ms"
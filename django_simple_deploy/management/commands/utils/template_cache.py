@@ -0,0 +1,87 @@
+"""Compile each template file once, and reuse it for every render.
+
+Plugins render several templates per run, and tools that configure many projects in
+one process render the same templates over and over. All templates are compiled by a
+single module-level `Engine`, and compiled templates are kept in an LRU cache keyed by
+path, mtime, and size. Editing a template changes its key, so the new version is
+compiled on its next use, and the old version eventually ages out of the cache.
+
+Plugins can compile the templates they use ahead of time with
+`plugin_utils.prewarm_templates()`.
+"""
+
+import re
+from functools import cached_property, lru_cache
+from pathlib import Path
+
+from django.template.engine import Engine
+
+
+# Maximum number of template files to keep compiled.
+CACHE_SIZE = 256
+
+ENGINE = Engine()
+
+# A settings template that starts with the current settings.
+_CURRENT_SETTINGS_RE = re.compile(r"\A\{\{\s*current_settings\s*\}\}")
+
+
+class TemplateFile:
+    """Source of a template file, compiled the first time it's needed."""
+
+    def __init__(self, source):
+        self.source = source
+
+    @cached_property
+    def template(self):
+        """The compiled template."""
+        return ENGINE.from_string(self.source)
+
+    @cached_property
+    def settings_block(self):
+        """The compiled template, without a leading {{ current_settings }}.
+
+        Most settings templates are the current settings followed by a platform-specific
+        block. Only the block needs to be rendered.
+
+        Returns:
+            Template | None: None if the template doesn't start with the current
+            settings, or uses them anywhere else.
+        """
+        m = _CURRENT_SETTINGS_RE.match(self.source)
+        if not m:
+            return None
+
+        block_source = self.source[m.end() :]
+        if "current_settings" in block_source:
+            return None
+        return ENGINE.from_string(block_source)
+
+
+def get_template(template_path):
+    """Get a template file, from the cache if it hasn't changed.
+
+    Returns:
+        TemplateFile
+    """
+    stat = Path(template_path).stat()
+    return _load_template(str(template_path), stat.st_mtime_ns, stat.st_size)
+
+
+def clear():
+    """Remove all compiled templates from the cache."""
+    _load_template.cache_clear()
+
+
+def cache_info():
+    """Get hit and miss statistics for the cache."""
+    return _load_template.cache_info()
+
+
+# --- Helper functions ---
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _load_template(path, mtime_ns, size):
+    """Read a template file. mtime_ns and size are only used as part of the key."""
+    return TemplateFile(Path(path).read_text())
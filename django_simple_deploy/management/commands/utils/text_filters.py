@@ -0,0 +1,63 @@
+"""Filters for cleaning up rendered templates.
+
+Each filter takes an iterable of lines, and yields lines. Filters are generators, so
+a chain of them makes a single pass over the rendered output, without building an
+intermediate string for each step.
+
+Lines keep their line endings, as from `str.splitlines(keepends=True)`.
+"""
+
+
+def strip_trailing_whitespace(lines):
+    """Remove whitespace at the end of each line, keeping the line ending."""
+    for line in lines:
+        body = line.rstrip("\r\n")
+        yield body.rstrip() + line[len(body) :]
+
+
+def collapse_blank_lines(lines):
+    """Replace runs of blank lines with a single blank line.
+
+    This matches `plugin_utils.remove_doubled_blank_lines()`; no more than two newlines
+    appear in a row. Lines containing only whitespace aren't treated as blank, so
+    put `strip_trailing_whitespace()` ahead of this filter.
+    """
+    newlines_in_row = 0
+    for line in lines:
+        if line in ("\n", "\r\n"):
+            if newlines_in_row >= 2:
+                continue
+            newlines_in_row += 1
+        elif line.endswith("\n"):
+            newlines_in_row = 1
+        else:
+            newlines_in_row = 0
+        yield line
+
+
+def ensure_final_newline(lines):
+    """Make sure non-empty output ends with a newline."""
+    line = ""
+    for line in lines:
+        yield line
+    if line and not line.endswith("\n"):
+        yield "\n"
+
+
+DEFAULT_FILTERS = (
+    strip_trailing_whitespace,
+    collapse_blank_lines,
+    ensure_final_newline,
+)
+
+
+def apply_filters(text, filters=DEFAULT_FILTERS):
+    """Run text through a chain of filters.
+
+    Returns:
+        Iterator of filtered lines.
+    """
+    lines = iter(text.splitlines(keepends=True))
+    for text_filter in filters:
+        lines = text_filter(lines)
+    return lines
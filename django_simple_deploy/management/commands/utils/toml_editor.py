@@ -0,0 +1,328 @@
+"""Edit TOML files in place, preserving comments, ordering, and formatting.
+
+Loading a file with `toml.load()` and writing it back with `toml.dumps()` rewrites the
+whole document. Comments are lost, and arrays and tables are reformatted. dsd only ever
+adds a few keys to a table, or adds a new table, so these edits are made by splicing new
+lines into the existing text:
+    [packages]
+    django = "*"
+    gunicorn = "*"    <- inserted after the last key in the table
+
+The document is scanned once to find table headers and key/value statements, tracking
+strings, arrays, and inline tables so multi-line values aren't mistaken for headers.
+Anything that can't be edited safely this way, such as a table defined with dotted keys
+or as an inline table, raises `UnsupportedTomlEdit`. Callers fall back to a full
+round-trip through the toml library in that case.
+"""
+
+import re
+from typing import NamedTuple
+
+import toml
+
+
+_BARE_KEY_RE = re.compile(r"[A-Za-z0-9_-]+")
+
+
+class UnsupportedTomlEdit(Exception):
+    """The requested edit can't be made without rewriting the document."""
+
+
+class _Statement(NamedTuple):
+    """A header or key/value statement, which may span several lines."""
+
+    # "header", "array_header", or "keyvalue".
+    kind: str
+    # Table name for headers, or the (possibly dotted) key for key/value statements.
+    key: tuple
+    start: int
+    # Offset just past the statement's final newline, or the end of the document.
+    end: int
+
+
+def set_values(contents, table, values):
+    """Set keys in an existing table.
+
+    Keys that are already in the table have their line replaced. New keys are added
+    after the last key in the table, so trailing comments and blank lines stay in
+    place.
+
+    Args:
+        contents: The TOML document.
+        table: Table name as a tuple, such as ("tool", "poetry", "dependencies").
+        values: Dict of keys to set.
+
+    Returns:
+        str: The modified document.
+
+    Raises:
+        UnsupportedTomlEdit: If the table isn't defined by a single header.
+    """
+    statements = _scan(contents)
+    headers = [i for i, st in enumerate(statements) if st.kind == "header"]
+    matches = [i for i in headers if statements[i].key == tuple(table)]
+    if len(matches) != 1:
+        raise UnsupportedTomlEdit(f"Table {'.'.join(table)} has no single header.")
+
+    # The table runs from its header to the next header of any kind.
+    header_index = matches[0]
+    table_statements = []
+    for statement in statements[header_index + 1 :]:
+        if statement.kind != "keyvalue":
+            break
+        table_statements.append(statement)
+
+    existing = {st.key: st for st in table_statements}
+    for key in existing:
+        if len(key) > 1 and key[0] in values:
+            raise UnsupportedTomlEdit(f"Key {key[0]} is defined with dotted keys.")
+
+    # Splice from the end of the document, so earlier offsets stay valid.
+    replacements = []
+    new_lines = ""
+    for key, value in values.items():
+        line = _format_line(key, value)
+        if (key,) in existing:
+            statement = existing[(key,)]
+            # The statement may be the last line of a file without a final newline.
+            if not contents[statement.start : statement.end].endswith("\n"):
+                line = line.rstrip("\n")
+            replacements.append((statement.start, statement.end, line))
+        else:
+            new_lines += line
+
+    if table_statements:
+        insert_at = table_statements[-1].end
+    else:
+        insert_at = statements[header_index].end
+    if new_lines:
+        if not contents[:insert_at].endswith("\n"):
+            new_lines = "\n" + new_lines
+        replacements.append((insert_at, insert_at, new_lines))
+
+    for start, end, text in sorted(replacements, reverse=True):
+        contents = contents[:start] + text + contents[end:]
+
+    return contents
+
+
+def add_tables(contents, tables, parsed_data):
+    """Add new tables at the end of the document.
+
+    Args:
+        contents: The TOML document.
+        tables: List of (table name tuple, dict of values), in the order they should
+            appear.
+        parsed_data: The document, as parsed by toml. Used to make sure the new
+            headers don't conflict with how existing parent tables are defined.
+
+    Returns:
+        str: The modified document.
+
+    Raises:
+        UnsupportedTomlEdit: If a table already exists, or a parent table is defined in
+        a way that a new header would conflict with.
+    """
+    header_names = [st.key for st in _scan(contents) if st.kind != "keyvalue"]
+
+    for table, _ in tables:
+        table = tuple(table)
+        data = parsed_data
+        for depth, key in enumerate(table, start=1):
+            if not isinstance(data, dict):
+                parent = ".".join(table[: depth - 1])
+                raise UnsupportedTomlEdit(f"{parent} isn't a table.")
+            if key not in data:
+                break
+            data = data[key]
+
+            # An existing parent must be defined by headers, not by dotted keys or an
+            # inline table.
+            prefix = table[:depth]
+            if not any(name[:depth] == prefix for name in header_names):
+                msg = f"{'.'.join(prefix)} isn't defined by headers."
+                raise UnsupportedTomlEdit(msg)
+        else:
+            raise UnsupportedTomlEdit(f"Table {'.'.join(table)} already exists.")
+
+    new_text = ""
+    for table, values in tables:
+        header = ".".join(_format_key(key) for key in table)
+        new_text += f"\n[{header}]\n"
+        new_text += "".join(_format_line(key, value) for key, value in values.items())
+
+    if not contents:
+        return new_text.lstrip("\n")
+    if not contents.endswith("\n"):
+        contents += "\n"
+    return contents + new_text
+
+
+# --- Helper functions ---
+
+
+def _format_line(key, value):
+    """Format a single key/value line, using toml for quoting."""
+    return toml.dumps({key: value})
+
+
+def _format_key(key):
+    """Format a single key part, quoting it if needed."""
+    if _BARE_KEY_RE.fullmatch(key):
+        return key
+    return toml.dumps({key: ""}).split(" = ")[0]
+
+
+def _scan(contents):
+    """Find every header and key/value statement in the document.
+
+    Comments and blank lines aren't included.
+
+    Returns:
+        list: _Statement instances, in document order.
+    """
+    statements = []
+    pos = 0
+    length = len(contents)
+    while pos < length:
+        start = pos
+        pos = _skip_whitespace(contents, pos)
+        if pos >= length:
+            break
+
+        char = contents[pos]
+        if char in "\r\n":
+            pos = _end_of_line(contents, pos)
+        elif char == "#":
+            pos = _end_of_line(contents, pos)
+        elif char == "[":
+            is_array = contents.startswith("[[", pos)
+            key, pos = _parse_key(contents, pos + (2 if is_array else 1), "]")
+            closing = "]]" if is_array else "]"
+            if not contents.startswith(closing, pos):
+                raise UnsupportedTomlEdit("Couldn't parse table header.")
+            pos = _end_of_line(contents, pos + len(closing))
+            kind = "array_header" if is_array else "header"
+            statements.append(_Statement(kind, key, start, pos))
+        else:
+            key, pos = _parse_key(contents, pos, "=")
+            pos = _skip_value(contents, pos + 1)
+            statements.append(_Statement("keyvalue", key, start, pos))
+
+    return statements
+
+
+def _skip_whitespace(contents, pos):
+    while pos < len(contents) and contents[pos] in " \t":
+        pos += 1
+    return pos
+
+
+def _end_of_line(contents, pos):
+    """Get the offset just past the next newline, or the end of the document."""
+    newline = contents.find("\n", pos)
+    return len(contents) if newline == -1 else newline + 1
+
+
+def _parse_key(contents, pos, terminator):
+    """Parse a possibly dotted key, ending at terminator.
+
+    Returns:
+        Tuple[tuple, int]: Key parts, and the offset of the terminator.
+    """
+    parts = []
+    while True:
+        pos = _skip_whitespace(contents, pos)
+        if contents.startswith('"', pos):
+            end = contents.find('"', pos + 1)
+            part = contents[pos + 1 : end]
+            if end == -1 or "\\" in part:
+                raise UnsupportedTomlEdit("Unsupported quoted key.")
+            pos = end + 1
+        elif contents.startswith("'", pos):
+            end = contents.find("'", pos + 1)
+            if end == -1:
+                raise UnsupportedTomlEdit("Unterminated quoted key.")
+            part = contents[pos + 1 : end]
+            pos = end + 1
+        else:
+            m = _BARE_KEY_RE.match(contents, pos)
+            if not m:
+                raise UnsupportedTomlEdit("Couldn't parse key.")
+            part = m.group()
+            pos = m.end()
+        parts.append(part)
+
+        pos = _skip_whitespace(contents, pos)
+        if contents.startswith(".", pos):
+            pos += 1
+        elif contents.startswith(terminator, pos):
+            return tuple(parts), pos
+        else:
+            raise UnsupportedTomlEdit("Couldn't parse key.")
+
+
+def _skip_value(contents, pos):
+    """Skip past a value, which may span lines inside strings, arrays, or tables.
+
+    Returns:
+        int: Offset just past the newline that ends the statement.
+    """
+    depth = 0
+    length = len(contents)
+    while pos < length:
+        char = contents[pos]
+        if char in "\"'":
+            pos = _skip_string(contents, pos)
+        elif char in "[{":
+            depth += 1
+            pos += 1
+        elif char in "]}":
+            depth -= 1
+            pos += 1
+        elif char == "#":
+            # A comment runs to the end of the line, even inside a multi-line array.
+            newline = contents.find("\n", pos)
+            pos = length if newline == -1 else newline
+        elif char == "\n":
+            pos += 1
+            if depth <= 0:
+                return pos
+        else:
+            pos += 1
+    return pos
+
+
+def _skip_string(contents, pos):
+    """Skip past a basic, literal, or multi-line string starting at pos."""
+    quote = contents[pos]
+    if contents.startswith(quote * 3, pos):
+        end = contents.find(quote * 3, pos + 3)
+        while quote == '"' and end != -1 and _is_escaped(contents, end):
+            end = contents.find(quote * 3, end + 1)
+        if end == -1:
+            raise UnsupportedTomlEdit("Unterminated multi-line string.")
+        # Up to two quotes may directly precede the closing delimiter.
+        end += 3
+        for _ in range(2):
+            if contents.startswith(quote, end):
+                end += 1
+        return end
+
+    end = pos + 1
+    while True:
+        end = contents.find(quote, end)
+        if end == -1 or "\n" in contents[pos:end]:
+            raise UnsupportedTomlEdit("Unterminated string.")
+        if quote == '"' and _is_escaped(contents, end):
+            end += 1
+            continue
+        return end + 1
+
+
+def _is_escaped(contents, pos):
+    """Check if the character at pos is escaped by an odd number of backslashes."""
+    backslashes = 0
+    while pos - backslashes - 1 >= 0 and contents[pos - backslashes - 1] == "\\":
+        backslashes += 1
+    return backslashes % 2 == 1
@@ -85,9 +85,20 @@ def pytest_sessionfinish(session, exitstatus):
 # --- /Plugins ---
 
 
+@pytest.fixture(scope="session", autouse=True)
+def isolate_user_cache(tmp_path_factory):
+    """Keep plugin manifests for test environments out of the user's cache directory.
+
+    Commands run in the test project's environment inherit this setting.
+    """
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("XDG_CACHE_HOME", str(tmp_path_factory.mktemp("cache")))
+        yield
+
+
 # Check prerequisites before running integration tests.
 @pytest.fixture(scope="session", autouse=True)
-def check_prerequisites(pytestconfig):
+def check_prerequisites(isolate_user_cache, pytestconfig):
     """Make sure dev environment supports integration tests."""
     ihf.check_plugin_available(pytestconfig)
 
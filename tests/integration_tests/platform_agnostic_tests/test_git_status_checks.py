@@ -118,6 +118,20 @@ def test_clean_git_status(tmp_project):
     assert "No uncommitted changes, other than django-simple-deploy work." in stdout
 
 
+def test_plan_leaves_project_unchanged(tmp_project):
+    """Call deploy with --plan, which shows changes without making them."""
+    dsd_command = "python manage.py deploy --plan"
+    stdout, stderr = msp.call_deploy(tmp_project, dsd_command)
+
+    assert "--- Planned changes ---" in stdout
+    assert "+++ b/blog/settings.py" in stdout
+    assert "--- Planned commands ---" in stdout
+
+    cmd = "git status --porcelain"
+    output_str = execute_quick_command(tmp_project, cmd).stdout.decode()
+    assert output_str == ""
+
+
 def test_unacceptable_settings_change(tmp_project):
     """Call deploy after adding a non-dsd line to settings.py."""
     path = tmp_project / "blog" / "settings.py"
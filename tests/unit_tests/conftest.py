@@ -1 +1,33 @@
 """Configuration for unit tests."""
+
+from io import StringIO
+
+from django_simple_deploy.management.commands.utils.plugin_utils import dsd_config
+
+import pytest
+
+
+@pytest.fixture(scope="session", autouse=True)
+def isolate_user_cache(tmp_path_factory):
+    """Keep files such as the plugin manifest out of the user's cache directory."""
+    with pytest.MonkeyPatch.context() as mp:
+        mp.setenv("XDG_CACHE_HOME", str(tmp_path_factory.mktemp("cache")))
+        yield
+
+
+@pytest.fixture
+def command_output(monkeypatch):
+    """Run commands for real, without a change set or log.
+
+    Returns:
+        StringIO: Everything plugin_utils writes to the console.
+    """
+    output = StringIO()
+    monkeypatch.setattr(dsd_config, "stdout", output)
+    monkeypatch.setattr(dsd_config, "log_output", False)
+    monkeypatch.setattr(dsd_config, "change_set", None)
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+    monkeypatch.setattr(dsd_config, "planned_commands", None)
+    monkeypatch.setattr(dsd_config, "on_windows", False)
+    monkeypatch.setattr(dsd_config, "use_shell", False)
+    return output
@@ -0,0 +1,73 @@
+"""Tests for running commands concurrently."""
+
+import asyncio
+import subprocess
+import sys
+import time
+
+from django_simple_deploy.management.commands.utils import async_commands
+from django_simple_deploy.management.commands.utils import plugin_utils
+
+import pytest
+
+
+def python_cmd(code):
+    return f'{sys.executable} -c "{code}"'
+
+
+# --- Test functions ---
+
+
+def test_run_commands_concurrently(command_output):
+    cmds = [python_cmd(f"print({n})") for n in range(6)]
+    outputs = plugin_utils.run_commands_concurrently(cmds)
+
+    assert [output.stdout.decode().strip() for output in outputs] == [
+        str(n) for n in range(6)
+    ]
+
+    with pytest.raises(subprocess.CalledProcessError):
+        plugin_utils.run_commands_concurrently(
+            [python_cmd("print(1)"), python_cmd("import sys; sys.exit(3)")], check=True
+        )
+
+
+def test_concurrency_is_bounded(command_output, monkeypatch):
+    """With two slots, four half-second commands take at least a second."""
+    monkeypatch.setattr(async_commands, "MAX_CONCURRENT_COMMANDS", 2)
+    cmds = [python_cmd("import time; time.sleep(0.5)")] * 4
+
+    start = time.perf_counter()
+    plugin_utils.run_commands_concurrently(cmds)
+    assert time.perf_counter() - start >= 1.0
+
+
+def test_slow_command_streams_stderr(command_output):
+    cmd = python_cmd("import sys; sys.stderr.write('Deploying...')")
+    asyncio.run(plugin_utils.async_run_slow_command(cmd))
+    assert "Deploying..." in command_output.getvalue()
+
+    # The error matches the one run_slow_command() raises.
+    cmd = python_cmd("exit(1)")
+    with pytest.raises(subprocess.CalledProcessError) as e:
+        asyncio.run(plugin_utils.async_run_slow_command(cmd))
+    assert e.value.cmd == cmd.split()
+
+
+def test_cancel_kills_process(command_output, tmp_path):
+    """Cancelling a task kills its command, instead of leaving it running."""
+    marker_path = tmp_path / "finished.txt"
+    code = f"import time; time.sleep(1); open(r'{marker_path}', 'w').close()"
+
+    async def run_and_cancel():
+        task = asyncio.create_task(
+            plugin_utils.async_run_quick_command(python_cmd(code))
+        )
+        await asyncio.sleep(0.3)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run_and_cancel())
+    asyncio.run(asyncio.sleep(1.5))
+    assert not marker_path.exists()
@@ -0,0 +1,191 @@
+"""Tests for staging project changes, and committing or rolling them back."""
+
+import json
+import sys
+from io import StringIO
+
+from django_simple_deploy.management.commands.utils import plugin_utils
+from django_simple_deploy.management.commands.utils.plugin_utils import dsd_config
+from django_simple_deploy.management.commands.utils.change_set import ChangeSet
+from django_simple_deploy.management.commands.utils.project_snapshot import (
+    ProjectSnapshot,
+)
+
+import pytest
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def change_set(monkeypatch):
+    """Make plugin_utils stage changes in a new change set."""
+    change_set = ChangeSet()
+    monkeypatch.setattr(dsd_config, "change_set", change_set)
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+    monkeypatch.setattr(dsd_config, "stdout", StringIO())
+    monkeypatch.setattr(dsd_config, "log_output", False)
+    monkeypatch.setattr(dsd_config, "on_windows", sys.platform == "win32")
+    return change_set
+
+
+# --- Test functions ---
+
+
+def test_commit_writes_staged_files(tmp_path):
+    existing_path = tmp_path / "existing.txt"
+    existing_path.write_text("Original contents.")
+    existing_path.chmod(0o640)
+    new_path = tmp_path / "new.txt"
+
+    change_set = ChangeSet()
+    change_set.write_file(existing_path, "Modified contents.")
+    change_set.write_file(new_path, "New file.")
+
+    # Nothing is written until the change set is committed.
+    assert existing_path.read_text() == "Original contents."
+    assert not new_path.exists()
+    assert change_set.read_text(new_path) == "New file."
+
+    assert change_set.commit() == [existing_path, new_path]
+    assert existing_path.read_text() == "Modified contents."
+    assert new_path.read_text() == "New file."
+    assert existing_path.stat().st_mode & 0o777 == 0o640
+    assert len(change_set) == 0
+
+    # No temporary files are left behind.
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["existing.txt", "new.txt"]
+
+
+def test_commit_failure_modifies_nothing(tmp_path):
+    """If any file can't be written, no project file is changed."""
+    path = tmp_path / "settings.py"
+    path.write_text("DEBUG = True")
+
+    change_set = ChangeSet()
+    change_set.write_file(path, "DEBUG = False")
+    change_set.write_file(tmp_path / "missing_dir" / "Procfile", "web: gunicorn")
+
+    with pytest.raises(OSError):
+        change_set.commit()
+
+    assert path.read_text() == "DEBUG = True"
+    assert [p.name for p in tmp_path.iterdir()] == ["settings.py"]
+
+
+def test_rollback(tmp_path):
+    change_set = ChangeSet()
+    change_set.add_dir(tmp_path / "static")
+    change_set.add_dir(tmp_path / ".platform")
+    (tmp_path / ".platform" / "routes.yaml").write_text("")
+    change_set.write_file(tmp_path / "Procfile", "web: gunicorn")
+
+    change_set.rollback()
+    change_set.commit()
+
+    # Directories are only removed if they're empty.
+    assert sorted(p.name for p in tmp_path.iterdir()) == [".platform"]
+
+
+def test_plugin_utils_stage_writes(tmp_path, change_set, monkeypatch):
+    """Helpers read staged changes, and commit them before running a command."""
+    req_txt_path = tmp_path / "requirements.txt"
+    req_txt_path.write_text("django")
+    dsd_config.project_snapshot = ProjectSnapshot.build([req_txt_path])
+
+    plugin_utils.add_req_txt_pkg(req_txt_path, "gunicorn", "")
+    plugin_utils.add_file(tmp_path / "Procfile", "web: gunicorn")
+    plugin_utils.modify_file(tmp_path / "Procfile", "web: gunicorn blog.wsgi")
+
+    assert req_txt_path.read_text() == "django"
+    assert not (tmp_path / "Procfile").exists()
+    assert plugin_utils._read_file(tmp_path / "Procfile") == "web: gunicorn blog.wsgi"
+
+    # Commands see changes made so far, and the snapshot sees changes they make.
+    script_path = tmp_path / "export.py"
+    script_path.write_text(
+        "from pathlib import Path\n"
+        "path = Path('requirements.txt')\n"
+        "print(path.read_text())\n"
+        "path.write_text('exported')\n"
+    )
+    monkeypatch.chdir(tmp_path)
+    output = plugin_utils.run_quick_command(f"{sys.executable} {script_path.name}")
+
+    assert output.stdout.decode().split() == ["django", "gunicorn"]
+    assert (tmp_path / "Procfile").read_text() == "web: gunicorn blog.wsgi"
+    assert plugin_utils._read_file(req_txt_path) == "exported"
+
+
+def test_plan_mode(tmp_path, monkeypatch):
+    """In plan mode, nothing is written, and commands are recorded instead of run."""
+    change_set = ChangeSet(dry_run=True)
+    monkeypatch.setattr(dsd_config, "change_set", change_set)
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+    monkeypatch.setattr(dsd_config, "stdout", StringIO())
+    monkeypatch.setattr(dsd_config, "log_output", False)
+    monkeypatch.setattr(dsd_config, "planned_commands", [])
+
+    plugin_utils.add_dir(tmp_path / "static")
+    plugin_utils.add_file(tmp_path / "static" / "placeholder.txt", "Placeholder.")
+    output = plugin_utils.run_quick_command("git commit -m 'Configured project.'")
+    plugin_utils.run_slow_command("git push heroku main")
+    plugin_utils.run_quick_command(
+        "heroku config:set SECRET_KEY=abc", skip_logging=True
+    )
+    assert plugin_utils.commit_staged_changes() == []
+
+    assert list(tmp_path.iterdir()) == []
+    assert output.returncode == 0
+    assert dsd_config.planned_commands == [
+        "git commit -m 'Configured project.'",
+        "git push heroku main",
+        "heroku *arguments hidden*",
+    ]
+    assert change_set.dirs == [tmp_path / "static"]
+    assert change_set.diff(tmp_path) == (
+        "--- /dev/null\n"
+        "+++ b/static/placeholder.txt\n"
+        "@@ -0,0 +1 @@\n"
+        "+Placeholder.\n"
+        "\\ No newline at end of file\n"
+    )
+
+
+def test_plan_mode_runs_read_only_commands(monkeypatch):
+    """Plugins can parse the output of read-only commands in plan mode."""
+    monkeypatch.setattr(dsd_config, "change_set", ChangeSet(dry_run=True))
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+    monkeypatch.setattr(dsd_config, "stdout", StringIO())
+    monkeypatch.setattr(dsd_config, "log_output", False)
+    monkeypatch.setattr(dsd_config, "on_windows", sys.platform == "win32")
+    monkeypatch.setattr(dsd_config, "planned_commands", [])
+
+    # This is how a plugin checks which account the platform's CLI is using.
+    code = "import json; print(json.dumps({'email': 'eric@example.com'}))"
+    whoami_cmd = f'{sys.executable} -c "{code}"'
+    output = plugin_utils.run_quick_command(whoami_cmd, read_only=True)
+    assert json.loads(output.stdout.decode()) == {"email": "eric@example.com"}
+
+    output = plugin_utils.run_quick_command("git --version")
+    assert output.stdout.decode().startswith("git version")
+
+    plugin_utils.run_quick_command("fly secrets set -a blog DEBUG=FALSE")
+    assert dsd_config.planned_commands == ["fly secrets set -a blog DEBUG=FALSE"]
+
+
+@pytest.mark.parametrize(
+    "cmd, read_only",
+    [
+        ("fly auth whoami --json", True),
+        ("fly apps list --json", True),
+        ("heroku apps:info --json", True),
+        ("fly version", True),
+        ("fly apps create --generate-name --json", False),
+        ("heroku config:set DEBUG=FALSE", False),
+        ("git push heroku main", False),
+        ("poetry export -f requirements.txt", False),
+    ],
+)
+def test_is_read_only(cmd, read_only):
+    assert plugin_utils._is_read_only(cmd) == read_only
@@ -0,0 +1,148 @@
+"""Tests for timeouts and stall handling when running commands."""
+
+import asyncio
+import subprocess
+import sys
+import time
+
+from django_simple_deploy.management.commands.utils import plugin_utils
+
+import pytest
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def stalling_script(tmp_path):
+    """A script that stalls the first time it runs, and finishes after that."""
+    path = tmp_path / "deploy.py"
+    path.write_text(
+        "import pathlib, time\n"
+        f"marker = pathlib.Path(r'{tmp_path / 'ran'}')\n"
+        "print('Building image...', flush=True)\n"
+        "if not marker.exists():\n"
+        "    marker.touch()\n"
+        "    time.sleep(5)\n"
+        "print('Deployed.')\n"
+    )
+    return f"{sys.executable} {path}"
+
+
+@pytest.fixture
+def grandchild_cmd(tmp_path):
+    """A command that starts a child holding its pipes, and then waits."""
+    path = tmp_path / "build.py"
+    path.write_text(
+        "import subprocess, sys, time\n"
+        "subprocess.Popen([sys.executable, '-c', 'import time; time.sleep(15)'])\n"
+        "time.sleep(15)\n"
+    )
+    return f"{sys.executable} {path}"
+
+
+@pytest.fixture
+def tty_script(tmp_path):
+    """A script that runs commands in a pty, and checks they can open /dev/tty.
+
+    The script exits with the number of commands that couldn't open /dev/tty.
+    """
+    path = tmp_path / "run_in_pty.py"
+    path.write_text(
+        "import io, os, pty, subprocess, sys\n"
+        "pid, fd = pty.fork()\n"
+        "if pid == 0:\n"
+        "    from django_simple_deploy.management.commands.utils import plugin_utils\n"
+        "    config = plugin_utils.dsd_config\n"
+        "    config.stdout, config.log_output = io.StringIO(), False\n"
+        "    config.on_windows, config.use_shell = False, False\n"
+        "    cmd = f'{sys.executable} -c \"open(\\'/dev/tty\\')\"'\n"
+        "    failures = plugin_utils.run_quick_command(cmd).returncode != 0\n"
+        "    try:\n"
+        "        plugin_utils.run_slow_command(cmd)\n"
+        "    except subprocess.CalledProcessError:\n"
+        "        failures += 1\n"
+        "    os._exit(failures)\n"
+        "while True:\n"
+        "    try:\n"
+        "        os.read(fd, 1024)\n"
+        "    except OSError:\n"
+        "        break\n"
+        "sys.exit(os.waitstatus_to_exitcode(os.waitpid(pid, 0)[1]))\n"
+    )
+    return path
+
+
+# --- Test functions ---
+
+
+def test_quick_command_timeout(command_output):
+    cmd = f'{sys.executable} -c "import time; time.sleep(5)"'
+    with pytest.raises(subprocess.TimeoutExpired):
+        plugin_utils.run_quick_command(cmd, timeout=0.2)
+
+    with pytest.raises(subprocess.TimeoutExpired):
+        asyncio.run(plugin_utils.async_run_quick_command(cmd, timeout=0.2))
+
+
+def test_slow_command_timeout(command_output, stalling_script):
+    with pytest.raises(subprocess.TimeoutExpired):
+        plugin_utils.run_slow_command(stalling_script, timeout=0.5)
+    assert "didn't finish within 0.5s" in command_output.getvalue()
+
+
+def test_stall_wait_shows_heartbeat(command_output, tmp_path):
+    path = tmp_path / "build.py"
+    path.write_text("import time\ntime.sleep(1)\nprint('Built.')\n")
+
+    plugin_utils.run_slow_command(
+        f"{sys.executable} {path}", stall_timeout=0.3, on_stall="wait"
+    )
+    assert command_output.getvalue().count("Still running") >= 2
+    assert command_output.getvalue().endswith("Built.\n")
+
+
+def test_stall_kill(command_output, stalling_script):
+    with pytest.raises(subprocess.TimeoutExpired):
+        plugin_utils.run_slow_command(
+            stalling_script, stall_timeout=0.3, on_stall="kill"
+        )
+    assert "Still running" in command_output.getvalue()
+    assert "Deployed." not in command_output.getvalue()
+
+
+def test_stall_retry(command_output, stalling_script):
+    plugin_utils.run_slow_command(stalling_script, stall_timeout=0.3, on_stall="retry")
+    assert "appears to have stalled" in command_output.getvalue()
+    assert command_output.getvalue().count("Building image...") == 2
+    assert command_output.getvalue().endswith("Deployed.\n")
+
+
+def test_invalid_stall_policy(command_output):
+    with pytest.raises(ValueError):
+        plugin_utils.run_slow_command("git push", on_stall="ignore")
+
+
+def test_timeout_kills_children(command_output, grandchild_cmd):
+    """A child that inherited the command's pipes doesn't keep the helpers waiting."""
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        plugin_utils.run_slow_command(grandchild_cmd, timeout=1)
+    with pytest.raises(subprocess.TimeoutExpired):
+        plugin_utils.run_quick_command(grandchild_cmd, timeout=1)
+    assert time.monotonic() - start < 6
+
+
+def test_stall_reported_once(command_output, grandchild_cmd):
+    start = time.monotonic()
+    with pytest.raises(subprocess.TimeoutExpired):
+        plugin_utils.run_slow_command(grandchild_cmd, stall_timeout=1, on_stall="kill")
+    assert time.monotonic() - start < 4
+    assert command_output.getvalue().count("appears to have stalled") == 1
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="Uses a pty.")
+def test_untimed_commands_keep_terminal(tty_script):
+    """Commands without a timeout can prompt on the terminal, ie for an ssh passphrase."""
+    output = subprocess.run([sys.executable, tty_script], capture_output=True)
+    assert output.returncode == 0, output.stderr.decode()
@@ -1,31 +1,110 @@
 """Test utility functions for examining git status."""
 
+import subprocess
 from textwrap import dedent
 
 from django_simple_deploy.management.commands.utils import dsd_utils
+from django_simple_deploy.management.commands.utils import git_status
 
 import pytest
 
 
-# --- Tests for checking git status ---
+# --- Tests for streaming `git status --porcelain=v2 -z` output ---
 
 
-def test_simple_git_status():
-    """Tests for simple `git status --porcelain` and `git diff --unified=0` outputs."""
-    status_output, diff_output = "", ""
-    assert dsd_utils.check_status_output(status_output, diff_output)
+def _v2_output(*records):
+    """Build v2 -z output from records."""
+    return b"".join(record.encode() + b"\0" for record in records)
+
 
-    status_output, diff_output = " M .gitignore", ""
-    assert dsd_utils.check_status_output(status_output, diff_output)
+def test_parse_v2_entries_across_chunks():
+    """Entries split across chunks, paths with spaces, and renames are parsed."""
+    output = _v2_output(
+        "1 .M N... 100644 100644 100644 abc123 abc123 blog/settings.py",
+        "2 R. N... 100644 100644 100644 abc123 abc123 R100 new name.py",
+        "old name.py",
+        "? dsd_logs/",
+    )
+    chunks = [output[i : i + 7] for i in range(0, len(output), 7)]
+    entries = list(git_status.iter_status_entries(chunks))
 
-    status_output, diff_output = " M settings.py", ""
-    assert dsd_utils.check_status_output(status_output, diff_output)
+    assert [str(entry) for entry in entries] == [
+        "1 .M blog/settings.py",
+        "2 R. new name.py <- old name.py",
+        "? dsd_logs/",
+    ]
 
-    status_output, diff_output = " M .gitignore\n M settings.py", ""
-    assert dsd_utils.check_status_output(status_output, diff_output)
 
-    status_output, diff_output = " M blog/settings.py\n?? dsd_logs/", ""
-    assert dsd_utils.check_status_output(status_output, diff_output)
+def test_simple_git_status():
+    """Allowed modifications, and dsd_logs/, don't rule out proceeding."""
+    changed = "1 .M N... 100644 100644 100644 abc123 abc123 {}"
+    for records in [
+        [],
+        [changed.format(".gitignore")],
+        [changed.format("settings.py")],
+        [changed.format(".gitignore"), changed.format("settings.py")],
+        [changed.format("blog/settings.py"), "? dsd_logs/"],
+    ]:
+        output = _v2_output(*records)
+        status = git_status.check_entries(git_status.iter_status_entries([output]))
+        assert status.proceed
+    assert dsd_utils.check_git_diff("")
+
+
+def test_check_v2_entries():
+    changed = "1 {} N... 100644 100644 100644 abc123 abc123 {}"
+
+    output = _v2_output(changed.format(".M", "blog/settings.py"), "? dsd_logs/")
+    status = git_status.check_entries(git_status.iter_status_entries([output]))
+    assert status.proceed
+    assert status.modified_paths == ["blog/settings.py"]
+
+    output = _v2_output(changed.format("M.", "blog/views.py"))
+    status = git_status.check_entries(git_status.iter_status_entries([output]))
+    assert not status.proceed
+
+    output = _v2_output("? dsd_logs/", "? notes.txt")
+    status = git_status.check_entries(git_status.iter_status_entries([output]))
+    assert not status.proceed
+
+
+def test_check_stops_at_first_disqualifying_entry():
+    """Entries after a disqualifying entry are never read."""
+    records = ["? build/", "? a.txt", "? b.txt"]
+    chunks = (_v2_output(record) for record in records)
+    status = git_status.check_entries(git_status.iter_status_entries(chunks))
+
+    assert not status.proceed
+    assert len(status.entries) == 1
+    # The generator wasn't exhausted.
+    assert next(chunks) == _v2_output("? a.txt")
+
+
+def test_diff_limited_to_allowed_paths(tmp_path):
+    """Only paths reported by status are diffed, from anywhere in the repo."""
+    env = {
+        "GIT_AUTHOR_NAME": "test",
+        "GIT_AUTHOR_EMAIL": "test@example.com",
+        "GIT_COMMITTER_NAME": "test",
+        "GIT_COMMITTER_EMAIL": "test@example.com",
+    }
+    (tmp_path / "blog").mkdir()
+    settings_path = tmp_path / "blog" / "settings.py"
+    settings_path.write_text("DEBUG = True\n")
+    large_path = tmp_path / "generated.json"
+    large_path.write_text("{}\n")
+    for cmd in ("git init -q", "git add .", "git commit -qm init"):
+        subprocess.run(cmd.split(), cwd=tmp_path, env=env, check=True)
+
+    settings_path.write_text("DEBUG = False\n")
+    large_path.write_text('{"data": 1}\n')
+
+    # Run from a subdirectory, as for nested projects.
+    diff_output = git_status.get_git_diff(["blog/settings.py"], cwd=tmp_path / "blog")
+    assert "+DEBUG = False" in diff_output
+    assert "generated.json" not in diff_output
+
+    assert git_status.get_git_diff([], cwd=tmp_path) == ""
 
 
 # --- Tests for checking overall git diff ---
@@ -43,7 +122,7 @@ def test_diff_ignore_sd_logs():
         +dsd_logs/"""
     )
 
-    assert dsd_utils._check_git_diff(diff_output)
+    assert dsd_utils.check_git_diff(diff_output)
 
 
 def test_diff_settings_sd_installed_apps():
@@ -58,7 +137,7 @@ def test_diff_settings_sd_installed_apps():
         @@ -134 +135 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'"""
     )
 
-    assert dsd_utils._check_git_diff(diff_output)
+    assert dsd_utils.check_git_diff(diff_output)
 
 
 def test_diff_settings_requirements_txt():
@@ -81,7 +160,7 @@ def test_diff_settings_requirements_txt():
         \\ No newline at end of file"""
     )
 
-    assert dsd_utils._check_git_diff(diff_output)
+    assert dsd_utils.check_git_diff(diff_output)
 
 
 def test_diff_unacceptable_change():
@@ -98,7 +177,7 @@ def test_diff_unacceptable_change():
         +# Placeholder comment to create unacceptable git status."""
     )
 
-    assert not dsd_utils._check_git_diff(diff_output)
+    assert not dsd_utils.check_git_diff(diff_output)
 
 
 def test_diff_sdlogs_gitignore_sd_installed_apps():
@@ -119,7 +198,7 @@ def test_diff_sdlogs_gitignore_sd_installed_apps():
         +    'django_simple_deploy',"""
     )
 
-    assert dsd_utils._check_git_diff(diff_output)
+    assert dsd_utils.check_git_diff(diff_output)
 
 
 # --- Tests for _clean_diff(); also includes test of checking the clean diff ---
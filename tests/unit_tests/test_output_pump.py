@@ -0,0 +1,56 @@
+"""Tests for streaming stdout and stderr at the same time."""
+
+import subprocess
+import sys
+
+from django_simple_deploy.management.commands.utils import plugin_utils
+from django_simple_deploy.management.commands.utils.output_pump import pump_output
+
+import pytest
+
+
+# --- Test functions ---
+
+
+def test_large_output_on_both_streams():
+    """Filling both pipes doesn't deadlock, and no lines are lost."""
+    code = (
+        "import sys\n"
+        "for n in range(20000):\n"
+        "    sys.stdout.write(f'out {n}\\n')\n"
+        "    sys.stderr.write(f'err {n}\\n')\n"
+    )
+    lines = []
+    with subprocess.Popen(
+        [sys.executable, "-c", code], stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    ) as p:
+        pump_output({"stdout": p.stdout, "stderr": p.stderr}, lines.append, 10)
+
+    assert p.returncode == 0
+    stdout_lines = [line.text for line in lines if line.stream == "stdout"]
+    assert stdout_lines == [f"out {n}\n" for n in range(20000)]
+    assert len(lines) == 40000
+    timestamps = [line.timestamp for line in lines]
+    assert timestamps == sorted(timestamps)
+
+
+def test_run_slow_command_streams_stdout(command_output):
+    script = "print('Building...',flush=True);__import__('sys').stderr.write('Done')"
+    plugin_utils.run_slow_command(f"{sys.executable} -c {script}")
+    assert command_output.getvalue() == "Building...\nDone"
+
+    with pytest.raises(subprocess.CalledProcessError):
+        plugin_utils.run_slow_command(f"{sys.executable} -c exit(2)")
+
+
+def test_callback_error_doesnt_block_process():
+    """If on_line() raises, the process can still exit, and readers stop quietly."""
+    code = "for n in range(20000): print(n)"
+
+    def on_line(line):
+        raise KeyboardInterrupt
+
+    with subprocess.Popen([sys.executable, "-c", code], stdout=subprocess.PIPE) as p:
+        with pytest.raises(KeyboardInterrupt):
+            pump_output({"stdout": p.stdout, "stderr": None}, on_line, 10)
+    assert p.returncode is not None
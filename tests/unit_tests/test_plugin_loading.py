@@ -0,0 +1,90 @@
+"""Tests for how the deploy command loads plugins."""
+
+from textwrap import dedent
+import sys
+
+from django_simple_deploy.management.commands import deploy
+from django_simple_deploy.management.commands.utils import dsd_utils
+from django_simple_deploy.plugins import pm
+
+import pytest
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def lazy_plugin(tmp_path, monkeypatch):
+    """Make a plugin that provides a lightweight plugin_meta module."""
+    plugin_dir = tmp_path / "dsd_lazyplugin"
+    plugin_dir.mkdir()
+    (plugin_dir / "__init__.py").write_text("")
+
+    meta_module = dedent(
+        """\
+        import django_simple_deploy
+
+
+        class PluginConfig:
+            automate_all_supported = False
+            platform_name = "Lazy Platform"
+
+
+        @django_simple_deploy.hookimpl
+        def dsd_get_plugin_config():
+            return PluginConfig()
+
+
+        @django_simple_deploy.hookimpl
+        def dsd_get_plugin_cli(parser):
+            parser.add_argument("--lazy-option", action="store_true")
+        """
+    )
+    (plugin_dir / "plugin_meta.py").write_text(meta_module)
+
+    deploy_module = dedent(
+        """\
+        import django_simple_deploy
+
+
+        @django_simple_deploy.hookimpl
+        def dsd_deploy():
+            pass
+        """
+    )
+    (plugin_dir / "deploy.py").write_text(deploy_module)
+
+    monkeypatch.syspath_prepend(str(tmp_path))
+    monkeypatch.setattr(dsd_utils, "get_plugin_name", lambda: "dsd_lazyplugin")
+
+    yield "dsd_lazyplugin"
+
+    # Don't let the fake plugin leak into other tests.
+    for name, plugin in pm.list_name_plugin():
+        if plugin.__name__.startswith("dsd_lazyplugin"):
+            pm.unregister(plugin)
+    for module_name in list(sys.modules):
+        if module_name.startswith("dsd_lazyplugin"):
+            del sys.modules[module_name]
+
+
+# --- Test functions ---
+
+
+def test_deploy_module_not_loaded_for_cli(lazy_plugin):
+    """Building the CLI shouldn't import the plugin's deploy module."""
+    command = deploy.Command()
+    parser = command.create_parser("manage.py", "deploy")
+
+    assert "--lazy-option" in parser.format_help()
+    assert f"{lazy_plugin}.deploy" not in sys.modules
+    assert not pm.hook.dsd_deploy.get_hookimpls()
+
+
+def test_deploy_module_loaded_at_handoff(lazy_plugin):
+    """The plugin's deploy module should be registered before handing off."""
+    command = deploy.Command()
+    command._load_plugin_deploy_module()
+
+    assert f"{lazy_plugin}.deploy" in sys.modules
+    assert len(pm.hook.dsd_deploy.get_hookimpls()) == 1
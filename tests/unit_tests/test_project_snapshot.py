@@ -0,0 +1,100 @@
+"""Tests for the project snapshot that's taken during inspection."""
+
+from pathlib import Path
+
+from django_simple_deploy.management.commands.utils import plugin_utils
+from django_simple_deploy.management.commands.utils.plugin_utils import dsd_config
+from django_simple_deploy.management.commands.utils.project_snapshot import (
+    ProjectSnapshot,
+)
+from django_simple_deploy.management.commands.utils.git_status import GitStatus
+
+import pytest
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def project_files(tmp_path):
+    """Write a few project files, and return their paths."""
+    resources_dir = Path(__file__).parent / "resources"
+    req_txt_path = tmp_path / "requirements.txt"
+    req_txt_path.write_text((resources_dir / "requirements.txt").read_text())
+    pptoml_path = tmp_path / "pyproject.toml"
+    pptoml_path.write_text((resources_dir / "pyproject.toml").read_text())
+
+    return req_txt_path, pptoml_path, tmp_path / "Pipfile"
+
+
+@pytest.fixture
+def snapshot_in_config(project_files):
+    """Make a snapshot available to plugin_utils, and clean up afterwards."""
+    dsd_config.project_snapshot = ProjectSnapshot.build(project_files)
+    yield dsd_config.project_snapshot
+    dsd_config.project_snapshot = None
+
+
+# --- Test functions ---
+
+
+def test_build_snapshot(project_files):
+    req_txt_path, pptoml_path, pipfile_path = project_files
+    snapshot = ProjectSnapshot.build(project_files)
+
+    assert snapshot.exists(req_txt_path)
+    assert not snapshot.exists(pipfile_path)
+    assert snapshot.read_text(req_txt_path) == req_txt_path.read_text()
+    assert "poetry" in snapshot.load_toml(pptoml_path)["tool"]
+
+    with pytest.raises(FileNotFoundError):
+        snapshot.read_text(pipfile_path)
+
+
+def test_snapshot_not_modified_by_callers(project_files):
+    """Changing parsed data, or making an updated copy, leaves the snapshot intact."""
+    req_txt_path, pptoml_path, pipfile_path = project_files
+    snapshot = ProjectSnapshot.build(project_files)
+
+    data = snapshot.load_toml(pptoml_path)
+    data["tool"]["poetry"]["dependencies"]["gunicorn"] = "*"
+    assert (
+        "gunicorn"
+        not in snapshot.load_toml(pptoml_path)["tool"]["poetry"]["dependencies"]
+    )
+
+    new_snapshot = snapshot.with_file(pipfile_path, "[packages]\n")
+    assert new_snapshot.exists(pipfile_path)
+    assert not snapshot.exists(pipfile_path)
+
+    # Copies don't share the parsed TOML cache.
+    new_snapshot = snapshot.with_git_output(None, "")
+    assert new_snapshot._parsed_toml is not snapshot._parsed_toml
+
+
+def test_helpers_read_from_snapshot(project_files, snapshot_in_config):
+    """plugin_utils helpers should use the snapshot, not the file on disk."""
+    req_txt_path, pptoml_path, pipfile_path = project_files
+
+    # If the helper went back to disk, it would see this change.
+    req_txt_path.write_text("changed-on-disk\n")
+
+    plugin_utils.add_req_txt_pkg(req_txt_path, "gunicorn", "")
+    contents = req_txt_path.read_text()
+    assert "changed-on-disk" not in contents
+    assert contents.endswith("\ngunicorn")
+
+    # The snapshot reflects what was written.
+    assert dsd_config.project_snapshot.read_text(req_txt_path) == contents
+
+
+def test_snapshot_with_git_output(project_files):
+    """Git output can be added after files are read, while git runs in parallel."""
+    req_txt_path, pptoml_path, pipfile_path = project_files
+    snapshot = ProjectSnapshot.build(project_files)
+
+    status = GitStatus(True)
+    new_snapshot = snapshot.with_git_output(status, "")
+    assert new_snapshot.git_status is status
+    assert new_snapshot.read_text(req_txt_path) == snapshot.read_text(req_txt_path)
+    assert snapshot.git_status is None
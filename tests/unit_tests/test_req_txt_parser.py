@@ -0,0 +1,95 @@
+"""Tests for parsing requirements files that include other files."""
+
+from textwrap import dedent
+
+from django_simple_deploy.management.commands.utils import req_txt_parser
+from django_simple_deploy.management.commands.utils import dsd_utils
+
+import pytest
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def req_files(tmp_path):
+    """Write a set of requirements files that reference each other."""
+    (tmp_path / "requirements").mkdir()
+    req_txt_path = tmp_path / "requirements.txt"
+    req_txt_path.write_text(
+        dedent(
+            """\
+            -r requirements/base.txt
+            --constraint=requirements/constraints.txt
+            --index-url https://pypi.org/simple
+
+            gunicorn==23.0.0 \\
+                --hash=sha256:abc123 \\
+                --hash=sha256:def456
+            -e git+https://github.com/org/dsd-plugin.git#egg=dsd-plugin
+            -r https://example.com/remote-requirements.txt
+            -r requirements/missing.txt
+            """
+        )
+    )
+    (tmp_path / "requirements" / "base.txt").write_text(
+        dedent(
+            """\
+            Django>=5.0  # The framework.
+            -r common.txt
+            """
+        )
+    )
+    (tmp_path / "requirements" / "common.txt").write_text("whitenoise\n-r base.txt\n")
+    (tmp_path / "requirements" / "constraints.txt").write_text("urllib3<3\n")
+
+    return req_txt_path
+
+
+# --- Test functions ---
+
+
+def test_follow_includes(req_files):
+    parsed = req_txt_parser.parse_req_txt_files(req_files)
+
+    names = [requirement.name for requirement in parsed.requirements]
+    assert names == ["Django", "whitenoise", "gunicorn", "dsd-plugin"]
+    assert [c.name for c in parsed.constraints] == ["urllib3"]
+
+    # Each requirement records which file it was found in.
+    sources = {r.name: r.source for r in parsed.requirements}
+    assert sources["Django"].endswith("requirements/base.txt")
+    assert sources["gunicorn"] == req_files.as_posix()
+
+    # Each file is read once, even though base.txt and common.txt include each other.
+    assert [path.name for path in parsed.paths] == [
+        "requirements.txt",
+        "base.txt",
+        "common.txt",
+        "constraints.txt",
+    ]
+
+
+def test_hashes_not_part_of_specifier(req_files):
+    parsed = req_txt_parser.parse_req_txt_files(req_files)
+    gunicorn = [r for r in parsed.requirements if r.name == "gunicorn"][0]
+    assert gunicorn.specifier == "==23.0.0"
+
+
+def test_included_files_cached(req_files, monkeypatch):
+    """Included files aren't re-read if they haven't changed."""
+    req_txt_parser.parse_req_txt_files(req_files)
+
+    def fail_open(*args, **kwargs):
+        raise AssertionError("Included file was read again.")
+
+    monkeypatch.setattr(req_txt_parser, "open", fail_open, raising=False)
+    contents = req_files.read_text() + "\npsycopg\n"
+    parsed = req_txt_parser.parse_req_txt_files(req_files, contents)
+    assert parsed.requirements[-1].name == "psycopg"
+
+
+def test_parse_req_txt_follows_includes(req_files):
+    requirements = dsd_utils.parse_req_txt(req_files)
+    assert "Django" in requirements
+    assert "urllib3" not in requirements
@@ -0,0 +1,165 @@
+"""Tests for the index of current requirements."""
+
+from io import StringIO
+from pathlib import Path
+
+import toml
+
+from django_simple_deploy.management.commands.utils import plugin_utils
+from django_simple_deploy.management.commands.utils.plugin_utils import dsd_config
+from django_simple_deploy.management.commands.utils.requirements_index import (
+    Requirement,
+    RequirementsIndex,
+)
+from django_simple_deploy.management.commands.utils.req_txt_parser import (
+    parse_req_txt_files,
+)
+
+import pytest
+
+
+# --- Test functions ---
+
+
+def test_normalized_membership():
+    index = RequirementsIndex(["Django_Simple.Deploy==1.0", "psycopg[binary]>=3.1"])
+
+    assert "django-simple-deploy" in index
+    assert "DJANGO_SIMPLE_DEPLOY" in index
+    assert "psycopg" in index
+    assert "psycopg[binary]" in index
+    assert "gunicorn" not in index
+
+    # Names are kept as written in the project.
+    assert list(index) == ["Django_Simple.Deploy", "psycopg"]
+    assert index.get("psycopg") == Requirement("psycopg", ("binary",), ">=3.1")
+
+
+def test_add_updates_index():
+    index = RequirementsIndex(["django"])
+    index.add("gunicorn")
+    index.add("Django>=5.0")
+
+    assert "gunicorn" in index
+    assert list(index) == ["django", "gunicorn"]
+    # An existing entry isn't replaced.
+    assert index.get("django").specifier == ""
+
+
+def test_parse_requirement_strings():
+    assert Requirement.parse(
+        "requests [socks, security] >= 2.0 ; python_version > '3'"
+    ) == (Requirement("requests", ("socks", "security"), ">= 2.0"))
+    assert Requirement.parse("git+https://github.com/org/repo.git#egg=my-pkg") == (
+        Requirement("my-pkg")
+    )
+    assert Requirement.parse("./local/path") is None
+
+
+def test_parse_direct_reference():
+    """A name @ url requirement is indexed by its name, not treated as a bare URL."""
+    url = "https://example.com/django_foo-1.0-py3-none-any.whl"
+    requirement = Requirement.parse(f"django-foo[extra] @ {url} ; python_version > '3'")
+    assert requirement == Requirement("django-foo", ("extra",), f"@ {url}")
+    assert str(requirement) == f"django-foo[extra] @ {url}"
+
+    index = RequirementsIndex([f"django-foo @ {url}", "django_bar@file:///tmp/bar"])
+    assert "django-foo" in index
+    assert "Django_Bar" in index
+
+
+def test_index_from_req_txt():
+    path = Path(__file__).parent / "resources" / "requirements.txt"
+    index = RequirementsIndex(parse_req_txt_files(path).requirements)
+    assert "django-bootstrap5" in index
+    assert "Django" in index
+
+
+def test_index_from_toml():
+    resources_dir = Path(__file__).parent / "resources"
+
+    index = RequirementsIndex.from_pipfile(toml.load(resources_dir / "Pipfile"))
+    assert "django" in index
+
+    index = RequirementsIndex.from_pyproject_toml(
+        toml.load(resources_dir / "pyproject.toml")
+    )
+    assert "python" not in index
+    assert "django" in index
+
+
+def test_add_package_normalized(tmp_path, monkeypatch):
+    """add_package() doesn't add a package that's present under another spelling."""
+    req_txt_path = tmp_path / "requirements.txt"
+    req_txt_path.write_text("Django_Simple-Deploy==1.0\n")
+
+    monkeypatch.setattr(dsd_config, "stdout", StringIO())
+    monkeypatch.setattr(dsd_config, "log_output", False)
+    monkeypatch.setattr(dsd_config, "pkg_manager", "req_txt")
+    monkeypatch.setattr(dsd_config, "req_txt_path", req_txt_path)
+    monkeypatch.setattr(
+        dsd_config,
+        "requirements",
+        RequirementsIndex(parse_req_txt_files(req_txt_path).requirements),
+    )
+
+    plugin_utils.add_package("django-simple-deploy", version="==1.0")
+    plugin_utils.add_package("gunicorn")
+    plugin_utils.add_package("Gunicorn")
+
+    lines = req_txt_path.read_text().split()
+    assert lines == ["Django_Simple-Deploy==1.0", "gunicorn"]
+    assert "gunicorn" in dsd_config.requirements
+
+
+def test_add_packages_single_write(tmp_path, monkeypatch):
+    """add_packages() writes the requirements file once, for all new packages."""
+    req_txt_path = tmp_path / "requirements.txt"
+    req_txt_path.write_text("django")
+
+    monkeypatch.setattr(dsd_config, "stdout", StringIO())
+    monkeypatch.setattr(dsd_config, "log_output", False)
+    monkeypatch.setattr(dsd_config, "pkg_manager", "req_txt")
+    monkeypatch.setattr(dsd_config, "req_txt_path", req_txt_path)
+    monkeypatch.setattr(dsd_config, "requirements", RequirementsIndex(["django"]))
+
+    writes = []
+    write_file = plugin_utils._write_file
+    monkeypatch.setattr(
+        plugin_utils,
+        "_write_file",
+        lambda path, contents: writes.append(path) or write_file(path, contents),
+    )
+
+    plugin_utils.add_packages(["gunicorn", "django", "whitenoise"])
+    with plugin_utils.batch_requirements():
+        plugin_utils.add_package("psycopg2", version="<2.9")
+        plugin_utils.add_package("dj-database-url")
+
+    assert writes == [req_txt_path, req_txt_path]
+    assert req_txt_path.read_text() == (
+        "django\ngunicorn\nwhitenoise\npsycopg2<2.9\ndj-database-url"
+    )
+
+
+def test_batch_creates_poetry_deploy_group(tmp_path, monkeypatch):
+    """A batch creates the Poetry deploy group and adds packages in one write."""
+    pptoml_path = tmp_path / "pyproject.toml"
+    pptoml_path.write_text(
+        '[tool.poetry.dependencies]\npython = "^3.10"\ndjango = "^5.0"\n'
+    )
+
+    output = StringIO()
+    monkeypatch.setattr(dsd_config, "stdout", output)
+    monkeypatch.setattr(dsd_config, "log_output", False)
+    monkeypatch.setattr(dsd_config, "pkg_manager", "poetry")
+    monkeypatch.setattr(dsd_config, "pyprojecttoml_path", pptoml_path)
+    monkeypatch.setattr(dsd_config, "requirements", RequirementsIndex(["django"]))
+
+    plugin_utils.add_packages(["gunicorn", "whitenoise"])
+
+    data = toml.load(pptoml_path)
+    deploy_group = data["tool"]["poetry"]["group"]["deploy"]
+    assert deploy_group["optional"] is True
+    assert deploy_group["dependencies"] == {"gunicorn": "*", "whitenoise": "*"}
+    assert output.getvalue().count("Added optional deploy group") == 1
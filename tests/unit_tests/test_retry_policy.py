@@ -0,0 +1,90 @@
+"""Tests for retrying commands that fail for temporary reasons."""
+
+import subprocess
+import sys
+
+from django_simple_deploy.management.commands.utils import plugin_utils
+from django_simple_deploy.management.commands.utils.plugin_utils import RetryPolicy
+
+import pytest
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture(autouse=True)
+def skip_delays(monkeypatch):
+    """Don't actually wait between attempts."""
+    monkeypatch.setattr(plugin_utils.time, "sleep", lambda delay: None)
+
+
+@pytest.fixture
+def flaky_cmd(tmp_path):
+    """A command that fails twice with a rate limit error, then succeeds."""
+    path = tmp_path / "create_app.py"
+    path.write_text(
+        "import pathlib, sys\n"
+        f"counter = pathlib.Path(r'{tmp_path / 'attempts'}')\n"
+        "attempts = len(counter.read_text()) if counter.exists() else 0\n"
+        "counter.write_text('x' * (attempts + 1))\n"
+        "if attempts < 2:\n"
+        "    sys.stderr.write('Error: rate limit exceeded\\n')\n"
+        "    sys.exit(1)\n"
+        "print('Created app.')\n"
+    )
+    return f"{sys.executable} {path}"
+
+
+# --- Test functions ---
+
+
+def test_should_retry():
+    policy = RetryPolicy(max_attempts=3, exit_codes=[75], stderr_patterns=[r"50[23]"])
+
+    assert policy.should_retry(75, "", attempt=1)
+    assert policy.should_retry(1, "HTTP 502 Bad Gateway", attempt=2)
+    assert not policy.should_retry(1, "Invalid app name", attempt=1)
+    assert not policy.should_retry(75, "", attempt=3)
+    assert not policy.should_retry(0, "", attempt=1)
+    assert RetryPolicy().should_retry(1, "Anything", attempt=1)
+
+
+def test_delay_has_full_jitter(monkeypatch):
+    policy = RetryPolicy(base_delay=1, max_delay=5)
+    monkeypatch.setattr("random.uniform", lambda low, high: high)
+    assert [policy.get_delay(attempt) for attempt in range(1, 6)] == [1, 2, 4, 5, 5]
+
+    monkeypatch.setattr("random.uniform", lambda low, high: low)
+    assert policy.get_delay(3) == 0
+
+
+def test_quick_command_retries(command_output, flaky_cmd):
+    policy = RetryPolicy(stderr_patterns=[r"rate limit"])
+    result = plugin_utils.run_quick_command(flaky_cmd, check=True, retry=policy)
+
+    assert result.stdout.decode() == "Created app.\n"
+    assert "(attempt 1 of 3). Retrying in" in command_output.getvalue()
+    assert "(attempt 2 of 3). Retrying in" in command_output.getvalue()
+
+
+def test_quick_command_gives_up(command_output, flaky_cmd):
+    # Failures that don't match the policy aren't retried.
+    result = plugin_utils.run_quick_command(
+        flaky_cmd, retry=RetryPolicy(exit_codes=[75])
+    )
+    assert result.returncode == 1
+    assert command_output.getvalue().endswith("(attempt 1 of 3).")
+
+    policy = RetryPolicy(max_attempts=1, stderr_patterns=[r"rate limit"])
+    with pytest.raises(subprocess.CalledProcessError):
+        plugin_utils.run_quick_command(flaky_cmd, check=True, retry=policy)
+    assert command_output.getvalue().endswith("(attempt 1 of 1).")
+    assert "Retrying" not in command_output.getvalue()
+
+
+def test_slow_command_retries(command_output, flaky_cmd):
+    policy = RetryPolicy(stderr_patterns=[r"rate limit"])
+    plugin_utils.run_slow_command(flaky_cmd, retry=policy)
+
+    assert command_output.getvalue().count("rate limit exceeded") == 2
+    assert command_output.getvalue().endswith("Created app.\n")
@@ -0,0 +1,72 @@
+"""Tests for finding and editing dsd-managed settings blocks."""
+
+from textwrap import dedent
+
+from django_simple_deploy.management.commands.utils.settings_blocks import (
+    SettingsBlocks,
+)
+
+
+SETTINGS = dedent(
+    """\
+    DEBUG = True
+
+    # django-simple-deploy: begin Heroku settings
+    ALLOWED_HOSTS.append(".herokuapp.com")
+    # django-simple-deploy: end Heroku settings
+
+    # Fly.io settings.
+    ALLOWED_HOSTS.append(".fly.dev")
+    """
+)
+
+
+# --- Test functions ---
+
+
+def test_index_blocks():
+    blocks = SettingsBlocks(SETTINGS, {"Fly.io": "# Fly.io settings."})
+
+    assert blocks.names() == ["Heroku", "Fly.io"]
+    assert "Upsun" not in blocks
+    assert blocks.get_text("Heroku").startswith("# django-simple-deploy: begin")
+    assert blocks.get_text("Heroku").endswith("end Heroku settings\n")
+    assert blocks.get_text("Fly.io") == (
+        '# Fly.io settings.\nALLOWED_HOSTS.append(".fly.dev")\n'
+    )
+
+
+def test_start_line_matched_literally():
+    """Regex metacharacters in a start line don't need escaping."""
+    text = "DEBUG = True\n# Platform (beta) settings.*\nX = 1\n"
+    blocks = SettingsBlocks(text, {"beta": "# Platform (beta) settings.*"})
+
+    assert blocks.remove("beta") == "DEBUG = True\n"
+
+
+def test_replace_and_remove():
+    blocks = SettingsBlocks(SETTINGS, {"Fly.io": "# Fly.io settings."})
+
+    # Replacing an earlier block shifts the blocks after it.
+    blocks.replace("Heroku", "SECURE_SSL_REDIRECT = True")
+    assert "SECURE_SSL_REDIRECT = True\n# django-simple-deploy: end" in blocks.text
+    assert blocks.get_text("Fly.io").startswith("# Fly.io settings.")
+
+    # A new block goes at the end.
+    blocks.replace("Upsun", "X = 1\n")
+    assert blocks.names() == ["Heroku", "Fly.io", "Upsun"]
+
+    # Blank lines between blocks aren't part of either block.
+    blocks.remove("Fly.io")
+    blocks.remove("Heroku")
+    assert blocks.text == dedent(
+        """\
+        DEBUG = True
+
+
+        # django-simple-deploy: begin Upsun settings
+        X = 1
+        # django-simple-deploy: end Upsun settings
+        """
+    )
+    assert SettingsBlocks(blocks.text).names() == ["Upsun"]
@@ -0,0 +1,64 @@
+"""Tests for parsing and reporting startup import times."""
+
+from textwrap import dedent
+
+from django_simple_deploy.management.commands.utils import startup_profiler
+
+import pytest
+
+
+# --- Fixtures ---
+
+
+@pytest.fixture
+def importtime_output():
+    """Sample output from `python -X importtime`."""
+    return dedent(
+        """\
+        import time: self [us] | cumulative | imported package
+        import time:       300 |        300 |     django.utils.version
+        import time:       200 |        500 |   django.utils
+        import time:      1000 |       1500 | django
+        import time:       400 |        400 |   toml
+        import time:      2000 |       2400 | django_simple_deploy.management.commands.deploy
+        import time:      1500 |       1500 | dsd_flyio.deploy
+        import time:       700 |        700 | blog.settings
+        """
+    )
+
+
+# --- Test functions ---
+
+
+def test_parse_importtime(importtime_output):
+    roots = startup_profiler.parse_importtime(importtime_output)
+    assert [root.name for root in roots] == [
+        "django",
+        "django_simple_deploy.management.commands.deploy",
+        "dsd_flyio.deploy",
+        "blog.settings",
+    ]
+
+    django_node = roots[0]
+    assert django_node.self_us == 1000
+    assert django_node.cumulative_us == 1500
+    assert [child.name for child in django_node.children] == ["django.utils"]
+    assert django_node.children[0].children[0].name == "django.utils.version"
+
+
+def test_build_report(importtime_output):
+    roots = startup_profiler.parse_importtime(importtime_output)
+    summary, report = startup_profiler.build_report(roots, "dsd_flyio", {"blog"})
+
+    summary_lines = [" ".join(line.split()) for line in summary.splitlines()]
+    assert "Django 1.5 ms" in summary_lines
+    assert "django-simple-deploy 2.0 ms" in summary_lines
+    assert "Plugin (dsd_flyio) 1.5 ms" in summary_lines
+    assert "Project 0.7 ms" in summary_lines
+    assert "Other 0.4 ms" in summary_lines
+    assert "Total 6.1 ms" in summary_lines
+
+    # Slowest imports come first, and imports under the threshold are left out.
+    tree_lines = report.split("Slowest imports")[1].splitlines()[1:]
+    assert "django_simple_deploy.management.commands.deploy" in tree_lines[0]
+    assert not any("blog.settings" in line for line in tree_lines)
@@ -0,0 +1,24 @@
+"""Tests for the filters that clean up rendered templates."""
+
+from django_simple_deploy.management.commands.utils import plugin_utils
+from django_simple_deploy.management.commands.utils import text_filters
+
+import pytest
+
+
+# --- Test functions ---
+
+
+@pytest.mark.parametrize(
+    "contents",
+    ["", "\n\n\n", "a\n\n\n\nb", "a\n\nb\n\n\n", "\n\n\n\na\n\n\n\n\nb\nc"],
+)
+def test_collapse_matches_remove_doubled_blank_lines(contents):
+    lines = text_filters.apply_filters(contents, [text_filters.collapse_blank_lines])
+    assert "".join(lines) == plugin_utils.remove_doubled_blank_lines(contents)
+
+
+def test_default_filters():
+    contents = "[build]  \n  \t\n\n\n[env]\r\n  PORT = 8000  "
+    lines = text_filters.apply_filters(contents)
+    assert "".join(lines) == "[build]\n\n[env]\r\n  PORT = 8000\n"
@@ -0,0 +1,101 @@
+"""Tests for format-preserving edits to TOML files."""
+
+from textwrap import dedent
+
+import toml
+
+from django_simple_deploy.management.commands.utils import toml_editor
+
+import pytest
+
+
+PIPFILE = dedent(
+    """\
+    [[source]]
+    url = "https://pypi.org/simple"
+    name = "pypi"
+
+    [packages]
+    # Web framework.
+    django = "*"
+    requests = {version = "*", extras = [
+        "socks",  # [not a header]
+    ]}
+    notes = \"\"\"
+    [dev-packages]
+    \"\"\"
+
+    # Comment at the end of the table.
+
+    [dev-packages]
+    pytest = "*"
+    """
+)
+
+
+# --- Test functions ---
+
+
+def test_set_values_preserves_formatting():
+    """New keys go after the last key in the table, and nothing else changes."""
+    contents = toml_editor.set_values(PIPFILE, ("packages",), {"gunicorn": "*"})
+
+    expected = PIPFILE.replace('"""\n\n#', '"""\ngunicorn = "*"\n\n#')
+    assert contents == expected
+    assert toml.loads(contents)["packages"]["gunicorn"] == "*"
+    assert "gunicorn" not in toml.loads(contents)["dev-packages"]
+
+
+def test_set_values_replaces_existing_key():
+    contents = toml_editor.set_values(PIPFILE, ("packages",), {"django": "<6"})
+
+    assert contents == PIPFILE.replace('django = "*"', 'django = "<6"')
+
+
+def test_set_values_no_final_newline():
+    contents = '[packages]\ndjango = "*"'
+    contents = toml_editor.set_values(contents, ("packages",), {"a": "*"})
+    assert contents == '[packages]\ndjango = "*"\na = "*"\n'
+
+
+@pytest.mark.parametrize(
+    "contents",
+    [
+        '[tool]\npoetry.dependencies = {django = "*"}\n',
+        '[tool.poetry]\ndependencies = {django = "*"}\n',
+        '[tool.poetry.dependencies]\ndjango = "*"\n[tool.poetry.dependencies]\n',
+    ],
+)
+def test_set_values_unsupported(contents):
+    """Tables that aren't defined by a single header can't be edited in place."""
+    with pytest.raises(toml_editor.UnsupportedTomlEdit):
+        toml_editor.set_values(contents, ("tool", "poetry", "dependencies"), {"a": "*"})
+
+
+def test_add_tables():
+    contents = '[tool.poetry]\nname = "demo"  # Comment.'
+    tables = [
+        (("tool", "poetry", "group", "deploy"), {"optional": True}),
+        (("tool", "poetry", "group", "deploy", "dependencies"), {"gunicorn": "*"}),
+    ]
+
+    new_contents = toml_editor.add_tables(contents, tables, toml.loads(contents))
+    assert new_contents == contents + dedent(
+        """
+
+        [tool.poetry.group.deploy]
+        optional = true
+
+        [tool.poetry.group.deploy.dependencies]
+        gunicorn = "*"
+        """
+    )
+
+
+def test_add_tables_parent_defined_inline():
+    """A new header can't extend a table that was defined inline."""
+    contents = "[tool.poetry]\ngroup = {dev = {optional = true}}\n"
+    tables = [(("tool", "poetry", "group", "deploy"), {"optional": True})]
+
+    with pytest.raises(toml_editor.UnsupportedTomlEdit):
+        toml_editor.add_tables(contents, tables, toml.loads(contents))
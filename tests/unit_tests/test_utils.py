@@ -5,12 +5,15 @@ Note: May need to rethink handling of dsd_config, if tests start to affect each
 
 from pathlib import Path
 import filecmp
+from io import StringIO
 import sys
+import json
 import subprocess
 
 from django_simple_deploy.management.commands.utils import dsd_utils
 from django_simple_deploy.management.commands.utils import plugin_utils
 from django_simple_deploy.management.commands.utils.plugin_utils import dsd_config
+from django_simple_deploy.management.commands.utils import template_cache
 from django_simple_deploy.management.commands.utils.command_errors import (
     DSDCommandError,
 )
@@ -109,6 +112,49 @@ def test_get_plugin_name_too_many_plugins():
         plugin_name = dsd_utils._get_plugin_name_from_packages(available_packages)
 
 
+def test_find_plugin_names_uses_manifest(tmp_path, monkeypatch):
+    """Test that a warm run reads plugin names from the manifest, without scanning."""
+    monkeypatch.setattr(dsd_utils, "_scan_for_plugin_names", lambda: ["dsd_flyio"])
+    assert dsd_utils.find_plugin_names(cache_dir=tmp_path) == ["dsd_flyio"]
+
+    def fail_scan():
+        raise AssertionError("Installed distributions should not be scanned.")
+
+    monkeypatch.setattr(dsd_utils, "_scan_for_plugin_names", fail_scan)
+    assert dsd_utils.find_plugin_names(cache_dir=tmp_path) == ["dsd_flyio"]
+
+
+def test_find_plugin_names_stale_manifest(tmp_path, monkeypatch):
+    """Test that the manifest is rebuilt when site-packages has changed."""
+    monkeypatch.setattr(dsd_utils, "_scan_for_plugin_names", lambda: ["dsd_flyio"])
+    dsd_utils.find_plugin_names(cache_dir=tmp_path)
+
+    # Simulate installing a different plugin.
+    site_packages = tmp_path / "site-packages"
+    site_packages.mkdir()
+    monkeypatch.setattr(sys, "path", sys.path + [str(site_packages)])
+    monkeypatch.setattr(dsd_utils, "_scan_for_plugin_names", lambda: ["dsd_upsun"])
+
+    assert dsd_utils.find_plugin_names(cache_dir=tmp_path) == ["dsd_upsun"]
+
+
+def test_plugin_manifest_pruned(tmp_path, monkeypatch):
+    """Test that one manifest is kept, without entries for removed environments."""
+    monkeypatch.setattr(dsd_utils, "_scan_for_plugin_names", lambda: ["dsd_flyio"])
+    old_prefix = tmp_path / "old_env"
+    old_prefix.mkdir()
+    monkeypatch.setattr(sys, "prefix", str(old_prefix))
+    dsd_utils.find_plugin_names(cache_dir=tmp_path)
+
+    old_prefix.rmdir()
+    monkeypatch.setattr(sys, "prefix", str(tmp_path))
+    dsd_utils.find_plugin_names(cache_dir=tmp_path)
+
+    manifest_path = tmp_path / dsd_utils.PLUGIN_MANIFEST_FILENAME
+    assert list(json.loads(manifest_path.read_text())) == [str(tmp_path)]
+    assert [path.name for path in tmp_path.iterdir()] == [manifest_path.name]
+
+
 # --- Parsing requirements ---
 
 
@@ -225,3 +271,163 @@ def test_add_file(tmp_path):
 
     contents_from_file = path.read_text()
     assert contents_from_file == contents
+
+
+def test_add_file_unchanged(tmp_path, monkeypatch):
+    """An existing file with the same contents isn't rewritten, or confirmed."""
+    dsd_config.unit_testing = "True"
+    dsd_config.stdout = sys.stdout
+    monkeypatch.setattr(dsd_config, "unchanged_files", [])
+
+    contents = "Sample file contents.\n"
+    path = tmp_path / "test_add_file.txt"
+    path.write_text(contents)
+    mtime_ns = path.stat().st_mtime_ns
+
+    monkeypatch.setattr(plugin_utils, "get_confirmation", lambda msg: pytest.fail())
+    plugin_utils.add_file(path, contents)
+    plugin_utils.modify_file(path, contents)
+
+    assert path.stat().st_mtime_ns == mtime_ns
+    assert dsd_config.unchanged_files == [path, path]
+
+
+def test_modify_settings_file_renders_block_only(tmp_path, monkeypatch):
+    """Current settings aren't passed through the template engine."""
+    dsd_config.stdout = sys.stdout
+    settings_path = tmp_path / "settings.py"
+    settings_path.write_text('SECRET_KEY = "{{ not_a_variable }}"\n')
+    monkeypatch.setattr(dsd_config, "settings_path", settings_path)
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+
+    template_path = tmp_path / "settings_template.py"
+    template_path.write_text("{{current_settings}}\n# {{ platform }} settings.\n")
+
+    plugin_utils.modify_settings_file(template_path, {"platform": "Fly.io"})
+    assert settings_path.read_text() == (
+        'SECRET_KEY = "{{ not_a_variable }}"\n\n# Fly.io settings.\n'
+    )
+
+
+def test_add_settings_block_replaces_block(tmp_path, monkeypatch):
+    """A second call in the same run replaces the block that was added."""
+    dsd_config.stdout = sys.stdout
+    settings_path = tmp_path / "settings.py"
+    settings_path.write_text("DEBUG = True\n")
+    monkeypatch.setattr(dsd_config, "settings_path", settings_path)
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+
+    template_path = tmp_path / "block.py"
+    template_path.write_text("\n# Platform settings.\nDEBUG = {{ debug }}\n")
+
+    plugin_utils.add_settings_block(template_path, {"debug": True})
+    plugin_utils.add_settings_block(template_path, {"debug": False})
+    assert settings_path.read_text() == (
+        "DEBUG = True\n\n# Platform settings.\nDEBUG = False\n"
+    )
+
+
+def test_get_template_string_caches_template(tmp_path):
+    """Templates are compiled once, and recompiled when they change."""
+    template_path = tmp_path / "Procfile"
+    template_path.write_text("web: gunicorn {{ project_name }}.wsgi")
+    plugin_utils.prewarm_templates([template_path])
+    template_file = template_cache.get_template(template_path)
+
+    contents = plugin_utils.get_template_string(template_path, {"project_name": "blog"})
+    assert contents == "web: gunicorn blog.wsgi"
+    assert template_cache.get_template(template_path) is template_file
+
+    template_path.write_text("web: gunicorn -w 2 {{ project_name }}.wsgi")
+    contents = plugin_utils.get_template_string(template_path, {"project_name": "blog"})
+    assert contents == "web: gunicorn -w 2 blog.wsgi"
+    assert template_cache.get_template(template_path) is not template_file
+
+
+def test_render_to_file(tmp_path, monkeypatch):
+    dsd_config.stdout = sys.stdout
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+    template_path = tmp_path / "fly.toml"
+    template_path.write_text(
+        'app = "{{ app_name }}"\n{% if pipenv %}\n[env]\n{% endif %}\n\n[http_service]'
+    )
+
+    path = tmp_path / "project_fly.toml"
+    plugin_utils.render_to_file(template_path, path, {"app_name": "blog"})
+    assert path.read_text() == 'app = "blog"\n\n[http_service]\n'
+
+
+def test_render_files(tmp_path, monkeypatch):
+    """Existing files are confirmed once, and unchanged files aren't rewritten."""
+    output = StringIO()
+    monkeypatch.setattr(dsd_config, "unit_testing", True)
+    monkeypatch.setattr(dsd_config, "stdout", output)
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+    monkeypatch.setattr(dsd_config, "unchanged_files", [])
+    template_path = tmp_path / "template.txt"
+    template_path.write_text("{{ name }} for {{ project }}")
+
+    (tmp_path / "Procfile").write_text("Procfile for blog\n")
+    (tmp_path / "Dockerfile").write_text("Old Dockerfile\n")
+    jobs = [
+        (template_path, tmp_path / name, {"name": name, "project": "blog"})
+        for name in ["Procfile", "Dockerfile", "fly.toml"]
+    ]
+
+    written_paths = plugin_utils.render_files(jobs)
+    assert written_paths == [tmp_path / "fly.toml", tmp_path / "Dockerfile"]
+    assert (tmp_path / "Dockerfile").read_text() == "Dockerfile for blog\n"
+    assert dsd_config.unchanged_files == [tmp_path / "Procfile"]
+    assert output.getvalue().count("(yes|no)") == 1
+
+
+def test_render_files_rejected(tmp_path, monkeypatch):
+    """If permission isn't granted, nothing is written."""
+    monkeypatch.setattr(dsd_config, "stdout", StringIO())
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+    monkeypatch.setattr(plugin_utils, "get_confirmation", lambda msg: False)
+    template_path = tmp_path / "template.txt"
+    template_path.write_text("{{ name }}")
+    (tmp_path / "Dockerfile").write_text("Old Dockerfile\n")
+    jobs = [
+        (template_path, tmp_path / name, {"name": name})
+        for name in ["fly.toml", "Dockerfile"]
+    ]
+
+    with pytest.raises(DSDCommandError):
+        plugin_utils.render_files(jobs)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["Dockerfile", "template.txt"]
+
+
+def test_modify_settings_file_appends_each_block(tmp_path, monkeypatch):
+    """Blocks from different templates are all kept."""
+    monkeypatch.setattr(dsd_config, "stdout", StringIO())
+    settings_path = tmp_path / "settings.py"
+    settings_path.write_text("DEBUG = True\n")
+    monkeypatch.setattr(dsd_config, "settings_path", settings_path)
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+
+    for name in ["A", "B"]:
+        template_path = tmp_path / f"settings_{name}.py"
+        template_path.write_text(f"{{{{ current_settings }}}}\n# Block {name}\n")
+        plugin_utils.modify_settings_file(template_path)
+
+    assert settings_path.read_text() == "DEBUG = True\n\n# Block A\n\n# Block B\n"
+
+
+def test_add_settings_block_keeps_other_blocks(tmp_path, monkeypatch):
+    monkeypatch.setattr(dsd_config, "stdout", StringIO())
+    settings_path = tmp_path / "settings.py"
+    settings_path.write_text("DEBUG = True\n")
+    monkeypatch.setattr(dsd_config, "settings_path", settings_path)
+    monkeypatch.setattr(dsd_config, "project_snapshot", None)
+
+    path_a, path_b = tmp_path / "block_a.py", tmp_path / "block_b.py"
+    path_a.write_text("# Block A\nX = {{ x }}\n")
+    path_b.write_text("# Block B\n")
+
+    plugin_utils.add_settings_block(path_a, {"x": "1"})
+    plugin_utils.add_settings_block(path_b)
+    plugin_utils.add_settings_block(path_a, {"x": "100"})
+    plugin_utils.add_settings_block(path_b)
+    assert settings_path.read_text() == "DEBUG = True\n# Block A\nX = 100\n# Block B\n"
@@ -2,16 +2,17 @@
 
 import os
 from pathlib import Path
-from importlib.metadata import packages_distributions
 import importlib
 
+from django_simple_deploy.management.commands.utils import dsd_utils
+
 
 def get_plugin_paths_rel():
     """Get relative paths to all plugins."""
 
-    # Get names of all plugins.
-    plugin_names = packages_distributions().keys()
-    plugin_names = [p for p in plugin_names if p.startswith("dsd_")]
+    # Get names of all plugins. Scan directly, so collecting tests doesn't write a
+    # plugin manifest to the user's cache directory.
+    plugin_names = dsd_utils._scan_for_plugin_names()
 
     plugin_paths = []
     for plugin_name in plugin_names: